@@ -1,7 +1,31 @@
 import os
+import base64
+import http.client
+import csv
+import gzip
+import hashlib
+import io
 import json
-from datetime import datetime
-from flask import Flask, render_template, request, jsonify
+import mimetypes
+import random
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import wraps
+from itertools import chain
+from datetime import datetime, timedelta
+from flask import Flask, Request, render_template, request, jsonify, g, Response, template_rendered, before_render_template
+from werkzeug.exceptions import RequestEntityTooLarge
 import secrets
 
 app = Flask(__name__)
@@ -15,35 +39,121 @@ SCOPES = ['https://www.googleapis.com/auth/drive',
 SPREADSHEET_ID = '1lJa_d4SOTmLu_TqI8rSbjaKJaBw8i5cBYRYOT3TcYB8'  # Ganti dengan ID spreadsheet Anda
 DRIVE_FOLDER_ID = None  # Akan dibuat otomatis
 
-# Inisialisasi services
-drive_service = None
-sheets_service = None
+# Cache metadata arsip (in-process, per worker)
+ARCHIVE_CACHE_TTL = int(os.environ.get('ARCHIVE_CACHE_TTL', 60))  # detik
+ARCHIVE_CACHE_MAX_ENTRIES = int(os.environ.get('ARCHIVE_CACHE_MAX_ENTRIES', 32))
+
+# Upload file
+MAX_UPLOAD_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE', 10 * 1024 * 1024))  # 10MB, batas default per file
+# Batas per kategori tingkat1 dalam MB, mis. UPLOAD_SIZE_LIMITS_MB='{"Kegiatan": 50}'
+UPLOAD_SIZE_LIMITS = {name: int(float(mb) * 1024 * 1024)
+                      for name, mb in json.loads(os.environ.get('UPLOAD_SIZE_LIMITS_MB', '{}')).items()}
+UPLOAD_MAX_FILE_SIZE = max([MAX_UPLOAD_SIZE, *UPLOAD_SIZE_LIMITS.values()])  # batas terbesar semua kategori
+UPLOAD_FORM_OVERHEAD = 1024 * 1024  # field teks + header multipart di luar isi file
+UPLOAD_MEMORY_BUFFER = 512 * 1024  # bagian file multipart lebih besar dari ini ditulis ke disk
+# Ukuran chunk resumable upload ke Drive (harus kelipatan 256KB)
+DRIVE_UPLOAD_CHUNK_SIZE = int(os.environ.get('DRIVE_UPLOAD_CHUNK_SIZE', 1024 * 1024))
+
+# Antrian job upload (Drive + Sheets diproses di background)
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 2))
+UPLOAD_SPOOL_FOLDER = os.environ.get('UPLOAD_SPOOL_FOLDER', 'data/spool')
+JOB_POLL_INTERVAL = 2  # detik, untuk job dari worker/proses lain
+JOB_LEASE_SECONDS = 600  # job 'running' tanpa progres selama ini dianggap ditinggalkan
+JOB_MAX_ATTEMPTS = 3
+# Jeda sebelum counter nomor arsip yang diisi dari data lokal dicocokkan lagi dengan Sheets
+COUNTER_SEED_RETRY_INTERVAL = int(os.environ.get('COUNTER_SEED_RETRY_INTERVAL', 60))  # detik
+# Jalankan worker upload dan outbox saat proses boot (0 untuk gunicorn --preload:
+# worker baru berjalan di proses worker saat request pertama)
+START_WORKERS_ON_BOOT = os.environ.get('START_WORKERS_ON_BOOT', '1') == '1'
+
+# Outbox: arsip yang jatuh ke penyimpanan lokal dikirim ulang ke Drive/Sheets
+OUTBOX_INTERVAL = int(os.environ.get('OUTBOX_INTERVAL', 60))  # detik antar putaran rekonsiliasi
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 50))
+OUTBOX_MAX_BACKOFF = 3600  # detik
+LOCAL_UPLOAD_FOLDER = 'static/uploads'
+
+# Upload massal (banyak file atau ZIP sekaligus)
+BULK_MAX_FILES = int(os.environ.get('BULK_MAX_FILES', 50))
+BULK_UPLOAD_WORKERS = int(os.environ.get('BULK_UPLOAD_WORKERS', 4))
+BULK_MAX_REQUEST_SIZE = int(os.environ.get('BULK_MAX_REQUEST_SIZE', 100 * 1024 * 1024))  # total body
+
+# Batas keras body request di level framework; batas per route/kategori dicek lebih awal
+app.config['MAX_CONTENT_LENGTH'] = max(UPLOAD_MAX_FILE_SIZE + UPLOAD_FORM_OVERHEAD, BULK_MAX_REQUEST_SIZE)
+
+# Deduplikasi berdasarkan hash SHA-256 isi file:
+# 'off' = nonaktif, 'reuse' = pakai ulang link file yang sudah ada, 'reject' = tolak upload
+DEDUP_MODE = os.environ.get('DEDUP_MODE', 'reuse')
+
+# Penggabungan append ke Google Sheets
+SHEETS_BATCH_WINDOW = float(os.environ.get('SHEETS_BATCH_WINDOW', 0.5))  # detik, setelah baris kedua
+SHEETS_BATCH_MAX_ROWS = int(os.environ.get('SHEETS_BATCH_MAX_ROWS', 50))
+
+# Sinkronisasi inkremental Google Sheets (hanya baris baru yang diambil)
+SHEETS_SYNC_CHECK_INTERVAL = int(os.environ.get('SHEETS_SYNC_CHECK_INTERVAL', 300))  # detik, cek kolom ID
+SHEETS_FULL_RESYNC_INTERVAL = int(os.environ.get('SHEETS_FULL_RESYNC_INTERVAL', 3600))  # detik
+
+# Metrics (format teks Prometheus di /metrics)
+METRICS_DIR = os.environ.get('METRICS_DIR', 'data/metrics')  # Snapshot per proses worker
+METRICS_FLUSH_INTERVAL = 5  # detik
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Database lokal (metadata mode demo/offline, counter nomor arsip, dll.)
+DB_FILE = os.environ.get('ARSIP_DB_FILE', 'data/arsip.db')
+LEGACY_STORAGE_FILE = 'data/archives.json'  # Format lama, dimigrasikan ke DB_FILE
+
+# Urutan kolom metadata (sama dengan kolom A:I di spreadsheet)
+UPLOAD_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'  # format kolom tanggal_upload
+ARCHIVE_FIELDS = ['id', 'nomor_arsip', 'tingkat1', 'tingkat2', 'judul',
+                  'deskripsi', 'tanggal_upload', 'link_drive', 'nama_file']
+# Pagination halaman daftar arsip
+ARSIP_PER_PAGE = int(os.environ.get('ARSIP_PER_PAGE', 25))
+ARSIP_MAX_PER_PAGE = 100
+# sort -> (kolom SQLite, descending)
+ARSIP_SORT_OPTIONS = {
+    'terlama': ('seq', False),
+    'terbaru': ('seq', True),
+    'nomor': ('nomor_arsip', False),
+    'judul': ('judul COLLATE NOCASE', False)
+}
+# API JSON arsip (/api/archives)
+API_COMPRESS_MIN_SIZE = 1024  # byte; respons lebih kecil dikirim tanpa kompresi
+EXPORT_BATCH_ROWS = int(os.environ.get('EXPORT_BATCH_ROWS', 1000))  # baris per baca dari sumber
+EXPORT_CHUNK_SIZE = 64 * 1024  # byte per chunk respons export
+SUGGEST_LIMIT = 8  # saran default /api/suggest
+SUGGEST_MAX_LIMIT = 20
+STATS_DEFAULT_DAYS = int(os.environ.get('STATS_DEFAULT_DAYS', 30))  # hari terakhir di /api/stats (0 = semua)
+INSERT_ARCHIVE_SQL = (f"INSERT INTO archives ({', '.join(ARCHIVE_FIELDS)}) "
+                      f"VALUES ({', '.join('?' for _ in ARCHIVE_FIELDS)})")
+
+# Inisialisasi services (lazy: dibuat saat pertama kali dibutuhkan atau saat warm-up)
+SERVICE_ACCOUNT_FILE = 'credentials.json'
+DRIVE_FOLDER_NAME = 'Arsip Digital'
+DRIVE_FOLDER_CACHE_FILE = 'data/drive_folder.json'  # Folder ID tersimpan antar boot
+BOOTSTRAP_RETRY_INTERVAL = 30  # detik sebelum inisialisasi yang gagal dicoba lagi
+# Ketahanan panggilan Google API: timeout, retry dengan backoff, circuit breaker
+GOOGLE_API_TIMEOUT = float(os.environ.get('GOOGLE_API_TIMEOUT', 20))  # detik per request HTTP
+GOOGLE_API_MAX_RETRIES = int(os.environ.get('GOOGLE_API_MAX_RETRIES', 3))
+GOOGLE_API_BACKOFF_BASE = 0.5  # detik, dikali 2 setiap retry (dengan jitter)
+GOOGLE_API_BACKOFF_MAX = 8  # detik
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', 5))  # gagal beruntun
+BREAKER_RESET_TIMEOUT = int(os.environ.get('BREAKER_RESET_TIMEOUT', 30))  # detik sebelum probe
+GOOGLE_HTTP_POOL_SIZE = int(os.environ.get('GOOGLE_HTTP_POOL_SIZE', 16))  # koneksi idle yang disimpan
+# Endpoint Google API alternatif, mis. server tiruan di benchmark/ (kosong = Google asli)
+GOOGLE_API_ENDPOINT = os.environ.get('GOOGLE_API_ENDPOINT', '').rstrip('/')
 
 try:
+    import google_auth_httplib2
+    from google.auth import exceptions as google_auth_exceptions
+    from google.auth.credentials import AnonymousCredentials
     from google.oauth2 import service_account
-    from googleapiclient.discovery import build
-    from googleapiclient.http import MediaFileUpload
-    
-    # Load credentials
-    SERVICE_ACCOUNT_FILE = 'credentials.json'
-    
-    if os.path.exists(SERVICE_ACCOUNT_FILE):
-        credentials = service_account.Credentials.from_service_account_file(
-            SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-        
-        # Inisialisasi services
-        drive_service = build('drive', 'v3', credentials=credentials)
-        sheets_service = build('sheets', 'v4', credentials=credentials)
-        
-        print("✅ Google API services berhasil diinisialisasi")
-        
-        # Buat folder otomatis di My Drive
-        DRIVE_FOLDER_ID = create_drive_folder()
-    else:
-        print("❌ File credentials.json tidak ditemukan")
-        
-except Exception as e:
+    from googleapiclient.discovery import build, build_from_document
+    from googleapiclient.discovery_cache import get_static_doc
+    from googleapiclient.errors import HttpError
+    from googleapiclient.http import build_http
+    from googleapiclient.http import MediaIoBaseUpload
+except ImportError as e:
     print(f"❌ Error inisialisasi: {e}")
+    service_account = None
 
 # Struktur kategori
 KATEGORI = {
@@ -54,8 +164,962 @@ KATEGORI = {
     'Laporan': ['01 - Laporan Bulanan', '02 - Laporan Tahunan', '03 - Laporan Khusus']
 }
 
+def process_start_time(pid):
+    """Waktu start proses (jiffies sejak boot, dari /proc) atau None jika tidak tersedia"""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # Nama proses (field 2) bisa berisi spasi; field 22 adalah ke-20 setelah ')'
+    return stat.rsplit(b')', 1)[1].split()[19].decode()
+
+_process_ids = {}  # pid -> id snapshot proses ini
+
+def process_id():
+    """ID unik proses ini: '<pid>-<waktu start>', sehingga PID yang dipakai ulang
+    (mis. worker 7-10 lagi setelah container restart) tidak dianggap proses lama"""
+    pid = os.getpid()
+    if pid not in _process_ids:
+        _process_ids[pid] = f'{pid}-{process_start_time(pid) or "r" + secrets.token_hex(4)}'
+    return _process_ids[pid]
+
+def process_alive(process):
+    """Apakah proses dengan ID dari process_id() masih berjalan di host ini"""
+    pid, _, started = process.partition('-')
+    try:
+        os.kill(int(pid), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        pass
+    if started.isdigit():
+        return process_start_time(pid) == started
+    # Tanpa /proc hanya PID yang bisa diperiksa
+    return True
+
+class Metrics:
+    """Counter dan histogram latency, diagregasi lintas proses via snapshot per proses"""
+
+    def __init__(self, directory, buckets, flush_interval):
+        self.directory = directory
+        self.buckets = buckets
+        self.flush_interval = flush_interval
+        self._counters = {}    # (nama, labels) -> nilai
+        self._histograms = {}  # (nama, labels) -> [count per bucket..., sum, count]
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        self._ensure_flusher()
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    hist[i] += 1
+            hist[-2] += value
+            hist[-1] += 1
+        self._ensure_flusher()
+
+    @contextmanager
+    def timer(self, stage):
+        """Ukur durasi satu tahap; exception dihitung sebagai error tahap tersebut"""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc('arsip_stage_errors_total', stage=stage)
+            raise
+        finally:
+            self.observe('arsip_stage_duration_seconds', time.perf_counter() - started, stage=stage)
+
+    def timed(self, stage):
+        """Decorator versi timer()"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _ensure_flusher(self):
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            # Setelah fork, data milik proses induk tidak ikut dihitung ulang
+            if self._flusher_pid is not None:
+                self._counters.clear()
+                self._histograms.clear()
+            self._flusher_pid = os.getpid()
+            try:
+                self._prepare_directory()
+            except OSError as e:
+                print(f"❌ Error preparing metrics directory: {e}")
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def _prepare_directory(self):
+        """Bersihkan snapshot run sebelumnya
+
+        Snapshot diberi nama process_id() (PID + waktu start). Jika tidak ada
+        proses lain yang masih hidup di antara pemilik snapshot, server baru
+        saja start sehingga semua file lama dihapus. Selama server berjalan,
+        snapshot worker yang sudah mati tetap dihitung agar counter tidak turun.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        own = f'{process_id()}.json'
+        filenames = [name for name in os.listdir(self.directory) if name.endswith('.json')]
+        if any(process_alive(name[:-len('.json')]) for name in filenames if name != own):
+            return
+        for name in filenames:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Error flushing metrics: {e}")
+
+    def flush(self):
+        """Tulis snapshot proses ini secara atomik ke METRICS_DIR/<process_id>.json"""
+        with self._lock:
+            snapshot = {
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, list(labels), hist] for (name, labels), hist in self._histograms.items()]
+            }
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{process_id()}.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(path + '.tmp', path)
+
+    def render(self):
+        """Gabungkan snapshot semua proses ke format teks Prometheus"""
+        self.flush()
+        counters, histograms = {}, {}
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, hist in snapshot['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                total = histograms.setdefault(key, [0] * len(hist))
+                for i, value in enumerate(hist):
+                    total[i] += value
+        
+        def fmt(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ''
+            escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"') for _, v in items)
+            return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + '}'
+        
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f'# TYPE {name} counter')
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f'{name}{fmt(labels)} {value}')
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f'# TYPE {name} histogram')
+            for (n, labels), hist in sorted(histograms.items()):
+                if n != name:
+                    continue
+                for bound, count in zip(self.buckets, hist):
+                    lines.append(f'{name}_bucket{fmt(labels, [("le", bound)])} {count}')
+                lines.append(f'{name}_bucket{fmt(labels, [("le", "+Inf")])} {hist[-1]}')
+                lines.append(f'{name}_sum{fmt(labels)} {hist[-2]}')
+                lines.append(f'{name}_count{fmt(labels)} {hist[-1]}')
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics(METRICS_DIR, METRICS_BUCKETS, METRICS_FLUSH_INTERVAL)
+
+class ArchiveRecord(Mapping):
+    """Satu arsip dalam bentuk ringkas: atribut __slots__ tanpa dict per baris
+
+    Dibaca seperti dict (record['judul'], .get(), dict(record)) maupun atribut
+    (archive.judul di template), tanpa __setitem__ sehingga aman dibagi antara
+    cache, indeks, dan statistik. Label kategori di-intern agar ribuan baris
+    memakai objek string yang sama.
+    """
+
+    __slots__ = tuple(ARCHIVE_FIELDS)
+    _FIELDS = frozenset(ARCHIVE_FIELDS)
+    _labels = {}  # label tingkat1/tingkat2 -> satu objek string bersama
+
+    def __init__(self, values):
+        """values: nilai kolom sesuai urutan ARCHIVE_FIELDS (kolom lebih diabaikan)"""
+        labels = self._labels
+        (self.id, self.nomor_arsip, tingkat1, tingkat2, self.judul, self.deskripsi,
+         self.tanggal_upload, self.link_drive, self.nama_file) = values[:len(ARCHIVE_FIELDS)]
+        self.tingkat1 = labels.setdefault(tingkat1, tingkat1)
+        self.tingkat2 = labels.setdefault(tingkat2, tingkat2)
+
+    @classmethod
+    def from_mapping(cls, data):
+        if isinstance(data, cls):
+            return data
+        return cls([data.get(field) for field in ARCHIVE_FIELDS])
+
+    def __getitem__(self, key):
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._FIELDS else default
+
+    def __iter__(self):
+        return iter(ARCHIVE_FIELDS)
+
+    def __len__(self):
+        return len(ARCHIVE_FIELDS)
+
+    def __repr__(self):
+        return f"ArchiveRecord({dict(self)!r})"
+
+class ArchiveCache:
+    """Cache metadata arsip dengan TTL dan jumlah entry terbatas (LRU)"""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0  # Naik hanya jika data diganti total (indeks/statistik dibangun ulang)
+        self._all_value = None  # Daftar 'all' terakhir, untuk mendeteksi data yang tidak berubah
+        self._checksum = 0  # archive_checksum(self._all_value), dilanjutkan oleh write-through
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    @property
+    def version(self):
+        """Versi isi data (jumlah + checksum), sama di semua proses untuk data yang sama"""
+        with self._lock:
+            return f"{len(self._all_value or ())}-{self._checksum:08x}"
+
+    def set_all(self, archives, replaced, checksum):
+        """Simpan daftar lengkap dari sumber metadata beserta checksum isinya
+
+        replaced=False berarti daftar lama hanya bertambah baris baru (yang
+        diteruskan pemanggil ke indeks secara inkremental), sehingga generasi
+        tidak naik dan indeks tidak perlu dibangun ulang.
+        """
+        with self._lock:
+            if replaced:
+                self.generation += 1
+            self._checksum = checksum
+            if archives is not self._all_value:
+                self._all_value = archives
+                # Entry turunan (hasil sort, halaman, jumlah) dihitung dari daftar lama
+                self._entries.clear()
+            self._entries['all'] = (time.monotonic() + self.ttl, archives)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def snapshot(self):
+        """(daftar 'all' terakhir, generasi) yang konsisten satu sama lain"""
+        with self._lock:
+            return self._all_value, self.generation
+
+    def versioned(self):
+        """(daftar 'all' terakhir, versi) yang diambil bersamaan, untuk body + ETag"""
+        with self._lock:
+            return self._all_value, f"{len(self._all_value or ())}-{self._checksum:08x}"
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def add_archive(self, data):
+        """Write-through: tambahkan arsip baru ke daftar yang sedang di-cache
+
+        Mengembalikan False jika daftar lengkap tidak sedang di-cache.
+        """
+        with self._lock:
+            entry = self._entries.pop('all', None)
+            count = self._entries.pop('count', None)
+            # Entry turunan (mis. hasil query) tidak lagi valid
+            self._entries.clear()
+            now = time.monotonic()
+            if count is not None and count[0] >= now:
+                self._entries['count'] = (count[0], count[1] + 1)
+            if entry is None or entry[0] < now:
+                return False
+            # Copy-on-write agar pembaca yang sedang iterasi tidak terganggu
+            record = ArchiveRecord.from_mapping(data)
+            self._all_value = entry[1] + [record]
+            self._checksum = archive_checksum([record], self._checksum)
+            self._entries['all'] = (entry[0], self._all_value)
+            return True
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 3) if total else 0.0
+            }
+
+archive_cache = ArchiveCache(ARCHIVE_CACHE_TTL, ARCHIVE_CACHE_MAX_ENTRIES)
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+def tokenize(text):
+    """Pecah teks menjadi token lowercase untuk indeks pencarian"""
+    return TOKEN_PATTERN.findall((text or '').lower())
+
+def archive_matches(archive, terms):
+    """Cocokkan satu arsip dengan semua term (prefix), semantik sama dengan SearchIndex"""
+    tokens = {(archive.get('nomor_arsip') or '').lower()}
+    for field in SearchIndex.FIELD_WEIGHTS:
+        tokens.update(tokenize(archive.get(field)))
+    return all(any(token.startswith(term) for token in tokens) for term in terms)
+
+def parse_upload_date(value):
+    """Parse tanggal_upload ('%Y-%m-%d %H:%M:%S'); None jika formatnya tidak dikenal"""
+    try:
+        return datetime.strptime(value or '', UPLOAD_DATE_FORMAT)
+    except ValueError:
+        return None
+
+def parse_date_range(date_from, date_to):
+    """Batas rentang tanggal dari parameter (YYYY-MM-DD atau YYYY-MM-DD HH:MM:SS)
+
+    Tanggal akhir tanpa jam mencakup seluruh hari tersebut. Mengembalikan
+    (start, end) berupa datetime atau None; ValueError jika format salah.
+    """
+    bounds = []
+    for value, end_of_day in ((date_from, False), (date_to, True)):
+        value = (value or '').strip()
+        if not value:
+            bounds.append(None)
+            continue
+        bound = parse_upload_date(value)
+        if bound is None:
+            try:
+                bound = datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                raise ValueError(f"Format tanggal tidak valid: {value} (gunakan YYYY-MM-DD)")
+            if end_of_day:
+                bound = bound.replace(hour=23, minute=59, second=59)
+        bounds.append(bound)
+    start, end = bounds
+    if start and end and start > end:
+        raise ValueError('Tanggal awal harus sebelum tanggal akhir')
+    return start, end
+
+def archive_in_date_range(archive, start, end):
+    """Cocokkan tanggal_upload satu arsip dengan rentang (semantik sama dengan SearchIndex)"""
+    uploaded = parse_upload_date(archive.get('tanggal_upload'))
+    return uploaded is not None and (not start or uploaded >= start) and (not end or uploaded <= end)
+
+class SearchIndex:
+    """Inverted index untuk pencarian arsip (judul, nomor_arsip, deskripsi)"""
+
+    # Bobot kemunculan token per field untuk ranking
+    FIELD_WEIGHTS = {'nomor_arsip': 5, 'judul': 3, 'deskripsi': 1}
+
+    def __init__(self):
+        self.generation = None  # Generasi cache yang menjadi sumber indeks
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._docs = {}        # id -> archive
+        self._seq = {}         # id -> urutan upload
+        self._postings = {}    # token -> {id: bobot}
+        self._tokens = []      # token terurut untuk prefix lookup (bisect)
+        self._facets = {}      # (field, nilai) -> set(id)
+        self._dates = []       # (tanggal_upload, seq, id) terurut untuk query rentang (bisect)
+        self._suggest_keys = []  # judul/nomor_arsip lowercase terurut untuk autocomplete
+        self._suggest_ids = []   # id arsip sejajar dengan _suggest_keys
+        self._bulk = False       # Saat rebuild kunci autocomplete diurutkan sekali di akhir
+
+    def rebuild(self, archives, generation=None):
+        with self._lock:
+            self._reset()
+            self._bulk = True
+            for archive in archives:
+                self.add(archive)
+            self._bulk = False
+            # Sort stabil: judul yang sama tetap urut upload
+            order = sorted(range(len(self._suggest_keys)), key=self._suggest_keys.__getitem__)
+            self._suggest_keys = [self._suggest_keys[i] for i in order]
+            self._suggest_ids = [self._suggest_ids[i] for i in order]
+            self.generation = generation
+        print(f"✅ Indeks pencarian dibangun ulang ({len(self._docs)} arsip)")
+
+    def add(self, archive):
+        with self._lock:
+            doc_id = archive['id']
+            if doc_id in self._docs:
+                return
+            self._docs[doc_id] = archive
+            self._seq[doc_id] = len(self._seq)
+            
+            weights = {}
+            for field, weight in self.FIELD_WEIGHTS.items():
+                for token in tokenize(archive.get(field)):
+                    weights[token] = weights.get(token, 0) + weight
+            # Nomor arsip utuh ('001.02') juga diindeks sebagai satu token
+            nomor = (archive.get('nomor_arsip') or '').lower()
+            if nomor:
+                weights[nomor] = weights.get(nomor, 0) + self.FIELD_WEIGHTS['nomor_arsip']
+            
+            for token, weight in weights.items():
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = {}
+                    insort(self._tokens, token)
+                postings[doc_id] = weight
+            
+            for field in ('tingkat1', 'tingkat2'):
+                self._facets.setdefault((field, archive.get(field)), set()).add(doc_id)
+            
+            uploaded = parse_upload_date(archive.get('tanggal_upload'))
+            if uploaded is not None:
+                insort(self._dates, (uploaded, self._seq[doc_id], doc_id))
+            
+            for key in {(archive.get('judul') or '').lower(), nomor} - {''}:
+                if self._bulk:
+                    self._suggest_keys.append(key)
+                    self._suggest_ids.append(doc_id)
+                else:
+                    i = bisect_right(self._suggest_keys, key)
+                    self._suggest_keys.insert(i, key)
+                    self._suggest_ids.insert(i, doc_id)
+
+    def suggest(self, prefix, limit):
+        """Arsip yang judul atau nomor_arsip-nya diawali prefix: O(log n + limit)
+
+        Mengembalikan (archive, teks yang cocok) urut abjad.
+        """
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        with self._lock:
+            results, seen = [], set()
+            i = bisect_left(self._suggest_keys, prefix)
+            while (i < len(self._suggest_keys) and len(results) < limit
+                   and self._suggest_keys[i].startswith(prefix)):
+                doc_id = self._suggest_ids[i]
+                if doc_id not in seen:
+                    seen.add(doc_id)
+                    archive = self._docs[doc_id]
+                    nomor = archive.get('nomor_arsip') or ''
+                    matched = nomor if nomor.lower() == self._suggest_keys[i] else archive.get('judul')
+                    results.append((archive, matched))
+                i += 1
+            return results
+
+    def _match_dates(self, start, end):
+        """ID arsip dengan tanggal_upload dalam rentang: O(log n + hasil)"""
+        lo = bisect_left(self._dates, (start,)) if start else 0
+        hi = bisect_right(self._dates, (end, float('inf'))) if end else len(self._dates)
+        return {doc_id for _, _, doc_id in self._dates[lo:hi]}
+
+    def _match_term(self, term):
+        """Skor dokumen untuk satu term: exact match + prefix match"""
+        scores = {}
+        i = bisect_left(self._tokens, term)
+        while i < len(self._tokens) and self._tokens[i].startswith(term):
+            token = self._tokens[i]
+            boost = 2 if token == term else 1
+            for doc_id, weight in self._postings[token].items():
+                scores[doc_id] = scores.get(doc_id, 0) + weight * boost
+            i += 1
+        return scores
+
+    def search(self, keyword='', tingkat1='', tingkat2='', date_from=None, date_to=None):
+        """Query AND multi-term dengan prefix matching, diurutkan berdasarkan skor
+
+        date_from/date_to (datetime, inklusif) membatasi tanggal_upload.
+        """
+        with self._lock:
+            candidates = None
+            for field, value in (('tingkat1', tingkat1), ('tingkat2', tingkat2)):
+                if value:
+                    ids = self._facets.get((field, value), set())
+                    candidates = ids if candidates is None else candidates & ids
+            if date_from or date_to:
+                ids = self._match_dates(date_from, date_to)
+                candidates = ids if candidates is None else candidates & ids
+            
+            terms = tokenize(keyword)
+            if not terms:
+                ids = self._docs.keys() if candidates is None else candidates
+                return [self._docs[i] for i in sorted(ids, key=self._seq.__getitem__)]
+            
+            scores = None
+            for term in sorted(set(terms), key=len, reverse=True):
+                term_scores = self._match_term(term)
+                if scores is None:
+                    scores = term_scores
+                    if candidates is not None:
+                        scores = {i: v for i, v in scores.items() if i in candidates}
+                else:
+                    scores = {i: v + term_scores[i] for i, v in scores.items() if i in term_scores}
+                if not scores:
+                    return []
+            
+            ranked = sorted(scores, key=lambda i: (-scores[i], -self._seq[i]))
+            return [self._docs[i] for i in ranked]
+
+    def __len__(self):
+        return len(self._docs)
+
+search_index = SearchIndex()
+
+def facet_counts(archives):
+    """Jumlah arsip per tingkat1 dan per tingkat2 (bersarang di bawah tingkat1)"""
+    tingkat1_counts, tingkat2_counts = {}, {}
+    for archive in archives:
+        tingkat1 = archive.get('tingkat1')
+        tingkat1_counts[tingkat1] = tingkat1_counts.get(tingkat1, 0) + 1
+        sub = tingkat2_counts.setdefault(tingkat1, {})
+        sub[archive.get('tingkat2')] = sub.get(archive.get('tingkat2'), 0) + 1
+    return {'tingkat1': tingkat1_counts, 'tingkat2': tingkat2_counts}
+
+class ArchiveStats:
+    """Statistik arsip (per kategori, per hari, total byte) yang diperbarui inkremental
+
+    Jumlah arsip mengikuti generasi ArchiveCache seperti SearchIndex; ukuran
+    file tidak ada di metadata sehingga dicatat di tabel archive_sizes.
+    """
+
+    def __init__(self):
+        self.generation = None  # Generasi cache yang menjadi sumber statistik
+        self.rebuilds = 0
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._ids = set()
+        self._tingkat1 = {}
+        self._tingkat2 = {}    # tingkat1 -> {tingkat2: jumlah}
+        self._per_day = {}     # 'YYYY-MM-DD' -> jumlah
+        self.total_bytes = 0
+
+    def _count(self, archive):
+        if archive['id'] in self._ids:
+            return
+        self._ids.add(archive['id'])
+        tingkat1, tingkat2 = archive.get('tingkat1'), archive.get('tingkat2')
+        self._tingkat1[tingkat1] = self._tingkat1.get(tingkat1, 0) + 1
+        sub = self._tingkat2.setdefault(tingkat1, {})
+        sub[tingkat2] = sub.get(tingkat2, 0) + 1
+        day = (archive.get('tanggal_upload') or '')[:10]
+        if day:
+            self._per_day[day] = self._per_day.get(day, 0) + 1
+
+    def rebuild(self, archives, generation=None):
+        with self._lock:
+            self._reset()
+            for archive in archives:
+                self._count(archive)
+            self.total_bytes = get_db().execute(
+                'SELECT COALESCE(SUM(ukuran), 0) FROM archive_sizes').fetchone()[0]
+            self.generation = generation
+            self.rebuilds += 1
+
+    def add(self, archive):
+        with self._lock:
+            self._count(archive)
+
+    def record_size(self, archive_id, size):
+        """Catat ukuran file arsip baru (sekali per arsip, aman saat job di-retry)"""
+        with self._lock:
+            cursor = get_db().execute(
+                'INSERT OR IGNORE INTO archive_sizes (archive_id, ukuran, created_at) VALUES (?, ?, ?)',
+                (archive_id, size, now_str()))
+            if cursor.rowcount:
+                self.total_bytes += size
+
+    def snapshot(self, days=None):
+        """Salinan statistik; semua kategori di KATEGORI selalu muncul (0 jika kosong)"""
+        with self._lock:
+            tingkat1 = {name: self._tingkat1.get(name, 0) for name in KATEGORI}
+            tingkat1.update(self._tingkat1)
+            tingkat2 = {name: {sub: self._tingkat2.get(name, {}).get(sub, 0) for sub in subs}
+                        for name, subs in KATEGORI.items()}
+            for name, subs in self._tingkat2.items():
+                tingkat2.setdefault(name, {}).update(subs)
+            cutoff = (datetime.now() - timedelta(days=days - 1)).strftime('%Y-%m-%d') if days else ''
+            per_day = sorted(item for item in self._per_day.items() if item[0] >= cutoff)
+            return {
+                'total': len(self._ids),
+                'total_bytes': self.total_bytes,
+                'tingkat1': tingkat1,
+                'tingkat2': tingkat2,
+                'per_day': dict(per_day)
+            }
+
+archive_stats = ArchiveStats()
+
+_resources = {}  # nama -> resource yang sudah berhasil diinisialisasi
+_resource_failed_at = {}  # nama -> waktu gagal terakhir
+_resource_locks = {}
+_resource_locks_guard = threading.Lock()
+
+def bootstrap_resource(name, factory):
+    """Inisialisasi resource sekali per proses; jika gagal dicoba lagi setelah interval"""
+    if name in _resources:
+        return _resources[name]
+    
+    with _resource_locks_guard:
+        lock = _resource_locks.setdefault(name, threading.Lock())
+    
+    with lock:
+        if name in _resources:
+            return _resources[name]
+        failed_at = _resource_failed_at.get(name)
+        if failed_at and time.monotonic() - failed_at < BOOTSTRAP_RETRY_INTERVAL:
+            return None
+        
+        try:
+            value = factory()
+        except Exception as e:
+            print(f"❌ Error inisialisasi {name}: {e}")
+            value = None
+        
+        if value is None:
+            _resource_failed_at[name] = time.monotonic()
+            return None
+        _resources[name] = value
+        return value
+
+class ServiceUnavailableError(Exception):
+    """Circuit breaker service Google sedang terbuka"""
+
+class CircuitBreaker:
+    """Circuit breaker per service: closed -> open setelah N kegagalan beruntun,
+    lalu half-open (satu probe) setelah reset_timeout; probe sukses menutup kembali"""
+
+    def __init__(self, name, failure_threshold, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = 0
+        self._probe_started = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            now = time.monotonic()
+            if self.state == 'open' and now - self._opened_at < self.reset_timeout:
+                return False
+            # Hanya satu probe sekaligus; probe yang tidak pernah melapor dianggap hilang
+            if self.state == 'half_open' and now - self._probe_started < self.reset_timeout:
+                return False
+            self.state = 'half_open'
+            self._probe_started = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                print(f"✅ Circuit breaker {self.name} tertutup kembali")
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+                if self.state == 'closed':
+                    self.trips += 1
+                    print(f"⚠️  Circuit breaker {self.name} terbuka, memakai jalur lokal")
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            stats = {'state': self.state, 'failures': self.failures, 'trips': self.trips}
+            if self.state == 'open':
+                stats['retry_in'] = round(max(self.reset_timeout - (time.monotonic() - self._opened_at), 0), 1)
+            return stats
+
+breakers = {name: CircuitBreaker(name, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+            for name in ('drive', 'sheets')}
+
+def is_transient_http_error(error):
+    """429, 5xx dan rate limit 403 dari Google"""
+    if not isinstance(error, HttpError):
+        return False
+    status = error.resp.status
+    return (status == 429 or status >= 500
+            or (status == 403 and b'ateLimitExceeded' in (error.content or b'')))
+
+def is_transport_error(error):
+    """Timeout atau koneksi putus: tidak diketahui apakah request sudah diproses
+
+    Termasuk kegagalan jaringan saat refresh token (TransportError dari
+    google-auth, atau RefreshError yang disebabkan olehnya).
+    """
+    if isinstance(error, google_auth_exceptions.RefreshError):
+        cause = error.__cause__ or error.__context__
+        return cause is not None and is_transport_error(cause)
+    if isinstance(error, google_auth_exceptions.TransportError):
+        return True
+    return isinstance(error, (OSError, http.client.HTTPException)) and not isinstance(error, HttpError)
+
+def retry_delay(error, attempt):
+    """Backoff eksponensial dengan full jitter; Retry-After dihormati jika ada"""
+    delay = random.uniform(0, min(GOOGLE_API_BACKOFF_MAX, GOOGLE_API_BACKOFF_BASE * 2 ** attempt))
+    resp = getattr(error, 'resp', None)
+    retry_after = resp.get('retry-after') if resp is not None else None
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, min(int(retry_after), GOOGLE_API_BACKOFF_MAX))
+    return delay
+
+class HttpPool:
+    """Pool transport HTTP ber-otorisasi untuk client Google
+
+    httplib2.Http tidak thread-safe, sehingga setiap panggilan meminjam satu
+    objek secara eksklusif lalu mengembalikannya; koneksi keep-alive di
+    dalamnya dipakai ulang oleh panggilan berikutnya. Saat pool kosong objek
+    baru dibuat (tidak menunggu), dan paling banyak max_idle yang disimpan.
+    """
+
+    def __init__(self, max_idle):
+        self.max_idle = max_idle
+        self.created = 0
+        self.in_use = 0
+        self._idle = []
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def new_http(self):
+        credentials = get_google_credentials()
+        # Timeout per request agar Google yang lambat tidak menahan request terlalu lama
+        base_http = build_http()  # Sudah menangani 308 resumable upload
+        base_http.timeout = GOOGLE_API_TIMEOUT
+        with self._lock:
+            self.created += 1
+        return google_auth_httplib2.AuthorizedHttp(credentials, http=base_http)
+
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Socket milik proses induk tidak boleh dipakai setelah fork
+                self._idle = []
+                self._pid = os.getpid()
+                self.in_use = 0
+            http = self._idle.pop() if self._idle else None
+            self.in_use += 1
+        reusable = False
+        try:
+            if http is None:
+                http = self.new_http()
+            yield http
+            reusable = True
+        except Exception as e:
+            # Koneksi yang putus/timeout dibuang, error lain tidak merusak koneksi
+            reusable = not is_transport_error(e)
+            raise
+        finally:
+            with self._lock:
+                self.in_use -= 1
+                if reusable and http is not None and len(self._idle) < self.max_idle:
+                    self._idle.append(http)
+
+    def stats(self):
+        return {'idle': len(self._idle), 'in_use': self.in_use, 'created': self.created}
+
+http_pool = HttpPool(GOOGLE_HTTP_POOL_SIZE)
+
+def google_call(service_name, func, idempotent=True):
+    """Panggil Google API lewat circuit breaker, dengan retry untuk error sementara
+
+    func menerima argumen http (execute/next_chunk milik googleapiclient) dan
+    setiap percobaan memakai transport pinjaman dari http_pool, sehingga aman
+    dipanggil dari banyak thread sekaligus. Saat breaker terbuka
+    ServiceUnavailableError langsung dilempar sehingga pemanggil segera
+    memakai jalur lokal. Request yang tidak idempotent (mis. append) tidak
+    di-retry setelah timeout agar tidak tertulis dua kali.
+    """
+    breaker = breakers[service_name]
+    if not breaker.allow():
+        metrics.inc('arsip_breaker_rejections_total', service=service_name)
+        raise ServiceUnavailableError(f'Google {service_name} sedang tidak tersedia (circuit breaker terbuka)')
+    
+    attempt = 0
+    while True:
+        try:
+            with http_pool.connection() as http:
+                result = func(http=http)
+        except Exception as e:
+            transport = is_transport_error(e)
+            if not transport and not is_transient_http_error(e):
+                # Error dari sisi request (mis. 400/404): service-nya sendiri sehat
+                breaker.record_success()
+                raise
+            # Setiap percobaan yang gagal dihitung, sehingga breaker cepat terbuka saat gangguan
+            breaker.record_failure()
+            if (attempt >= GOOGLE_API_MAX_RETRIES or breaker.state != 'closed'
+                    or (transport and not idempotent)):
+                raise
+            delay = retry_delay(e, attempt)
+            attempt += 1
+            metrics.inc('arsip_google_retries_total', service=service_name)
+            print(f"🔄 Google {service_name} gagal ({e}), retry {attempt}/{GOOGLE_API_MAX_RETRIES} "
+                  f"dalam {delay:.1f} detik")
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+def google_execute(service_name, api_request, idempotent=True):
+    """Eksekusi request googleapiclient melalui google_call"""
+    return google_call(service_name, api_request.execute, idempotent)
+
+def load_service_account_credentials():
+    if service_account is None:
+        return None
+    if GOOGLE_API_ENDPOINT:
+        # Server tiruan tidak memeriksa token
+        return AnonymousCredentials()
+    if not os.path.exists(SERVICE_ACCOUNT_FILE):
+        print("❌ File credentials.json tidak ditemukan")
+        return None
+    return service_account.Credentials.from_service_account_file(
+        SERVICE_ACCOUNT_FILE, scopes=SCOPES)
+
+def get_google_credentials():
+    return bootstrap_resource('credentials', load_service_account_credentials)
+
+def build_google_service(api, version):
+    if get_google_credentials() is None:
+        return None
+    # Objek service dipakai bersama antar thread; request-nya dieksekusi dengan
+    # transport dari http_pool (lihat google_call), http ini hanya untuk discovery
+    http = http_pool.new_http()
+    if GOOGLE_API_ENDPOINT:
+        # Ganti rootUrl di dokumen discovery agar URL upload media ikut diarahkan
+        document = json.loads(get_static_doc(api, version))
+        document['rootUrl'] = f"{GOOGLE_API_ENDPOINT}/"
+        document.pop('mtlsRootUrl', None)
+        service = build_from_document(document, http=http)
+    else:
+        service = build(api, version, http=http, cache_discovery=False)
+    print(f"✅ Google API service {api} berhasil diinisialisasi")
+    return service
+
+def get_drive_service():
+    """Client Google Drive (None jika tidak tersedia)"""
+    return bootstrap_resource('drive', lambda: build_google_service('drive', 'v3'))
+
+def get_sheets_service():
+    """Client Google Sheets (None jika tidak tersedia)"""
+    return bootstrap_resource('sheets', lambda: build_google_service('sheets', 'v4'))
+
+def resolve_drive_folder_id():
+    """Cari folder ID dari cache lokal, atau cari/buat folder di Drive lalu simpan"""
+    credentials = get_google_credentials()
+    if credentials is None:
+        return None
+    
+    cache_key = f"{getattr(credentials, 'service_account_email', '')}|{DRIVE_FOLDER_NAME}"
+    cached = {}
+    if os.path.exists(DRIVE_FOLDER_CACHE_FILE):
+        with open(DRIVE_FOLDER_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get(cache_key):
+            return cached[cache_key]
+    
+    folder_id = create_drive_folder(DRIVE_FOLDER_NAME)
+    if folder_id:
+        cached[cache_key] = folder_id
+        os.makedirs(os.path.dirname(DRIVE_FOLDER_CACHE_FILE), exist_ok=True)
+        tmp_file = f"{DRIVE_FOLDER_CACHE_FILE}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(cached, f, indent=2)
+        os.replace(tmp_file, DRIVE_FOLDER_CACHE_FILE)
+    return folder_id
+
+def get_drive_folder_id():
+    """Folder ID tujuan upload (DRIVE_FOLDER_ID jika dikonfigurasi manual)"""
+    return DRIVE_FOLDER_ID or bootstrap_resource('drive_folder', resolve_drive_folder_id)
+
+# Ditampilkan jika belum ada arsip sama sekali
+DEMO_ARCHIVES = [ArchiveRecord.from_mapping(archive) for archive in [
+    {
+        'id': 'demo1',
+        'nomor_arsip': '001.01',
+        'tingkat1': 'Surat Masuk',
+        'tingkat2': '01 - Surat dari Perusahaan',
+        'judul': 'Contoh Surat Masuk - DEMO',
+        'deskripsi': 'Ini adalah data demo. File disimpan secara lokal.',
+        'tanggal_upload': '2024-01-15 10:30:00',
+        'link_drive': '#',
+        'nama_file': 'demo_surat_masuk.pdf'
+    }
+]]
+
+@metrics.timed('drive_folder')
 def create_drive_folder(folder_name="Arsip Digital"):
     """Buat folder di Google Drive (My Drive)"""
+    drive_service = get_drive_service()
     if not drive_service:
         print("❌ Drive service tidak tersedia")
         return None
@@ -64,10 +1128,10 @@ def create_drive_folder(folder_name="Arsip Digital"):
         # Cek apakah folder sudah ada
         query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
         
-        existing_folders = drive_service.files().list(
+        existing_folders = google_execute('drive', drive_service.files().list(
             q=query,
             fields='files(id, name)'
-        ).execute()
+        ))
         
         if existing_folders.get('files'):
             folder_id = existing_folders['files'][0]['id']
@@ -80,10 +1144,10 @@ def create_drive_folder(folder_name="Arsip Digital"):
             'mimeType': 'application/vnd.google-apps.folder'
         }
         
-        folder = drive_service.files().create(
+        folder = google_execute('drive', drive_service.files().create(
             body=folder_metadata,
             fields='id'
-        ).execute()
+        ), idempotent=False)
         
         folder_id = folder.get('id')
         print(f"✅ Folder '{folder_name}' berhasil dibuat: {folder_id}")
@@ -94,57 +1158,212 @@ def create_drive_folder(folder_name="Arsip Digital"):
             'role': 'reader'
         }
         
-        drive_service.permissions().create(
+        google_execute('drive', drive_service.permissions().create(
             fileId=folder_id,
             body=permission_metadata
-        ).execute()
+        ))
         
         print("✅ Permission public reader diberikan ke folder")
         return folder_id
         
     except Exception as e:
+        metrics.inc('arsip_google_errors_total', service='drive', operation='folder')
         print(f"❌ Error creating drive folder: {e}")
         return None
 
-def upload_to_drive(file_path, file_name):
-    """Upload file ke Google Drive folder"""
-    if not drive_service or not DRIVE_FOLDER_ID:
+class UploadTooLargeError(Exception):
+    """File melebihi batas ukuran upload"""
+
+def upload_size_limit(tingkat1=None):
+    """Batas ukuran file untuk kategori tingkat1 (tanpa kategori: batas terbesar)"""
+    if not tingkat1:
+        return UPLOAD_MAX_FILE_SIZE
+    return UPLOAD_SIZE_LIMITS.get(tingkat1, MAX_UPLOAD_SIZE)
+
+def request_size_limit(req):
+    """Batas body request upload, dari route dan ?tingkat1= (None = hanya MAX_CONTENT_LENGTH)"""
+    if req.endpoint == 'upload_bulk':
+        return BULK_MAX_REQUEST_SIZE
+    if req.endpoint == 'upload':
+        return upload_size_limit(req.args.get('tingkat1')) + UPLOAD_FORM_OVERHEAD
+    return None
+
+class BoundedSpooledFile(tempfile.SpooledTemporaryFile):
+    """Penampung satu bagian file multipart yang langsung menolak (413) saat isinya
+    melewati batas, sehingga sisa body tidak ikut ditampung ke memori/disk"""
+
+    def __init__(self, limit):
+        super().__init__(max_size=UPLOAD_MEMORY_BUFFER)
+        self.limit = limit
+
+    def write(self, data):
+        if self.tell() + len(data) > self.limit:
+            raise RequestEntityTooLarge()
+        return super().write(data)
+
+class SpoolFile:
+    """Bagian file multipart yang ditulis parser langsung ke folder spool
+
+    SHA-256 dan ukuran dihitung sambil ditulis, dan penulisan melewati batas
+    langsung ditolak (413). File yang tidak diambil view lewat keep() dihapus
+    saat request selesai, sehingga setiap byte upload hanya ditulis sekali.
+    """
+
+    def __init__(self, limit):
+        os.makedirs(UPLOAD_SPOOL_FOLDER, exist_ok=True)
+        self.path = os.path.join(UPLOAD_SPOOL_FOLDER, secrets.token_hex(16))
+        self.limit = limit
+        self.size = 0
+        self.kept = False
+        self._digest = hashlib.sha256()
+        self._file = open(self.path, 'w+b')
+
+    def write(self, data):
+        if self.size + len(data) > self.limit:
+            raise RequestEntityTooLarge()
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        # read/seek/tell/close dan atribut file lain diteruskan ke file di disk
+        return getattr(self._file, name)
+
+    def keep(self):
+        """Serahkan file ke pemanggil; mengembalikan (spool_path, sha256, ukuran)"""
+        self._file.close()
+        self.kept = True
+        metrics.inc('arsip_upload_bytes_total', self.size)
+        return self.path, self._digest.hexdigest(), self.size
+
+    def discard(self):
+        self._file.close()
+        if not self.kept and os.path.exists(self.path):
+            os.remove(self.path)
+
+class ArsipRequest(Request):
+    """Request dengan parser form terbatas: field teks dan file dibatasi saat stream dibaca"""
+
+    max_form_memory_size = UPLOAD_FORM_OVERHEAD
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint == 'upload':
+            # Batas file dari ?tingkat1=; view memeriksa ulang dengan tingkat1 dari form
+            spool = SpoolFile(upload_size_limit(self.args.get('tingkat1')))
+            self.spool_files.append(spool)
+            return spool
+        limit = request_size_limit(self)
+        if limit is None:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return BoundedSpooledFile(limit)
+
+    @property
+    def spool_files(self):
+        """SpoolFile yang dibuat untuk request ini (dibersihkan di teardown)"""
+        files = self.__dict__.get('_spool_files')
+        if files is None:
+            files = self.__dict__['_spool_files'] = []
+        return files
+
+app.request_class = ArsipRequest
+
+def too_large_response(limit):
+    """Respons 413 JSON yang sama untuk semua jalur penolakan ukuran"""
+    metrics.inc('arsip_upload_rejected_total', reason='too_large')
+    return jsonify({
+        'success': False,
+        'message': f'File terlalu besar. Maksimal {limit // (1024 * 1024)}MB.'
+    }), 413
+
+class LimitedStream:
+    """Wrapper stream upload yang menolak pembacaan melewati batas ukuran"""
+
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.limit = limit
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.bytes_read = max(self.bytes_read, self.stream.tell())
+        if self.bytes_read > self.limit:
+            raise UploadTooLargeError(f'File melebihi batas {self.limit // (1024 * 1024)}MB')
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self.stream.seek(offset, whence)
+
+    def tell(self):
+        return self.stream.tell()
+
+@metrics.timed('drive_upload')
+def upload_to_drive(stream, file_name, mimetype=None, progress_callback=None, archive_id=None):
+    """Upload file ke Google Drive folder langsung dari stream (resumable, per chunk)"""
+    drive_service = get_drive_service()
+    folder_id = get_drive_folder_id() if drive_service else None
+    if not drive_service or not folder_id:
         print("❌ Drive service atau folder ID tidak tersedia")
         return None, None
     
     try:
         file_metadata = {
             'name': file_name,
-            'parents': [DRIVE_FOLDER_ID]
+            'parents': [folder_id]
         }
+        if archive_id:
+            # Kunci idempotensi: file arsip ini bisa dicari lagi di Drive
+            file_metadata['appProperties'] = {'archive_id': archive_id}
         
-        media = MediaFileUpload(file_path, resumable=True)
+        media = MediaIoBaseUpload(
+            stream,
+            mimetype=mimetype or 'application/octet-stream',
+            chunksize=DRIVE_UPLOAD_CHUNK_SIZE,
+            resumable=True
+        )
+        if media.size() > UPLOAD_MAX_FILE_SIZE:
+            raise UploadTooLargeError(f'File melebihi batas {UPLOAD_MAX_FILE_SIZE // (1024 * 1024)}MB')
         
         print(f"🔄 Mengupload {file_name} ke Google Drive...")
+        started = time.monotonic()
         
-        file = drive_service.files().create(
+        upload_request = drive_service.files().create(
             body=file_metadata,
             media_body=media,
             fields='id, webViewLink, webContentLink'
-        ).execute()
+        )
+        file = None
+        while file is None:
+            # Chunk yang gagal dilanjutkan dari posisi terakhir saat di-retry
+            status, file = google_call('drive', upload_request.next_chunk)
+            if status and progress_callback:
+                progress_callback(status.progress())
         
+        elapsed = max(time.monotonic() - started, 1e-6)
         file_id = file.get('id')
         web_view_link = file.get('webViewLink')
         
         print(f"✅ File berhasil diupload:")
         print(f"   File ID: {file_id}")
         print(f"   Link: {web_view_link}")
+        print(f"   {media.size()} bytes dalam {elapsed:.2f} detik "
+              f"({media.size() / elapsed / 1024:.1f} KB/s)")
+        metrics.inc('arsip_drive_upload_bytes_total', media.size())
         
         return file_id, web_view_link
         
+    except UploadTooLargeError:
+        raise
     except Exception as e:
+        metrics.inc('arsip_google_errors_total', service='drive', operation='upload')
         print(f"❌ Error uploading to Drive: {e}")
         return None, None
 
-def save_file_locally(file, filename):
+@metrics.timed('local_file_write')
+def save_file_locally(stream, filename):
     """Simpan file secara lokal (fallback)"""
+    file_path = None
     try:
-        upload_folder = 'static/uploads'
+        upload_folder = LOCAL_UPLOAD_FOLDER
         if not os.path.exists(upload_folder):
             os.makedirs(upload_folder)
         
@@ -152,189 +1371,1633 @@ def save_file_locally(file, filename):
         unique_filename = f"{secrets.token_hex(8)}{file_extension}"
         file_path = os.path.join(upload_folder, unique_filename)
         
-        file.save(file_path)
+        with open(file_path, 'wb') as f:
+            shutil.copyfileobj(stream, f, DRIVE_UPLOAD_CHUNK_SIZE)
         
         file_url = f"/static/uploads/{unique_filename}"
         print(f"✅ File disimpan secara lokal: {file_url}")
         return unique_filename, file_url
         
+    except UploadTooLargeError:
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+        raise
     except Exception as e:
+        metrics.inc('arsip_local_errors_total', operation='file_write')
         print(f"❌ Error saving file locally: {e}")
         return None, None
 
-def get_next_archive_number(tingkat1, tingkat2):
-    """Mendapatkan nomor arsip berikutnya"""
-    if not sheets_service or SPREADSHEET_ID == 'your-spreadsheet-id-here':
-        # Mode demo - generate dari data lokal
-        all_archives = get_all_archives()
-        max_num = 0
-        
-        for archive in all_archives:
-            try:
-                if archive['tingkat1'] == tingkat1:
-                    nomor_arsip = archive['nomor_arsip']
-                    num_part = nomor_arsip.split('.')[0]
-                    num = int(num_part)
-                    max_num = max(max_num, num)
-            except (ValueError, IndexError):
-                continue
-        
-        next_num = max_num + 1
-        return f"{next_num:03d}"
-    
+_db_local = threading.local()
+
+def get_db():
+    """Koneksi SQLite lokal (satu koneksi per thread, dibuat ulang setelah fork)"""
+    conn = getattr(_db_local, 'conn', None)
+    if conn is None or _db_local.pid != os.getpid():
+        os.makedirs(os.path.dirname(DB_FILE) or '.', exist_ok=True)
+        conn = sqlite3.connect(DB_FILE, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS archive_counters (
+                source TEXT NOT NULL,
+                tingkat1 TEXT NOT NULL,
+                last_number INTEGER NOT NULL,
+                PRIMARY KEY (source, tingkat1)
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS archives (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL UNIQUE,
+                nomor_arsip TEXT NOT NULL,
+                tingkat1 TEXT NOT NULL,
+                tingkat2 TEXT NOT NULL,
+                judul TEXT NOT NULL,
+                deskripsi TEXT NOT NULL DEFAULT '',
+                tanggal_upload TEXT NOT NULL,
+                link_drive TEXT,
+                nama_file TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_archives_tingkat1 ON archives (tingkat1);
+            CREATE INDEX IF NOT EXISTS idx_archives_tingkat2 ON archives (tingkat2);
+            CREATE INDEX IF NOT EXISTS idx_archives_nomor_arsip ON archives (nomor_arsip);
+            CREATE INDEX IF NOT EXISTS idx_archives_tanggal_upload ON archives (tanggal_upload);
+            CREATE TABLE IF NOT EXISTS upload_jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                progress INTEGER NOT NULL DEFAULT 0,
+                message TEXT,
+                payload TEXT NOT NULL,
+                result TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_until REAL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_upload_jobs_status ON upload_jobs (status, created_at);
+            CREATE TABLE IF NOT EXISTS outbox (
+                archive_id TEXT PRIMARY KEY,
+                archive TEXT NOT NULL,
+                need_drive INTEGER NOT NULL DEFAULT 0,
+                need_sheets INTEGER NOT NULL DEFAULT 0,
+                need_link INTEGER NOT NULL DEFAULT 0,
+                appended INTEGER NOT NULL DEFAULT 0,
+                local_link TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS archive_sizes (
+                archive_id TEXT PRIMARY KEY,
+                ukuran INTEGER NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS content_hashes (
+                sha256 TEXT PRIMARY KEY,
+                archive_id TEXT NOT NULL,
+                nomor_arsip TEXT NOT NULL,
+                link_drive TEXT NOT NULL,
+                ukuran INTEGER NOT NULL,
+                created_at TEXT NOT NULL
+            );
+        """)
+        _db_local.conn = conn
+        _db_local.pid = os.getpid()
+    return conn
+
+@contextmanager
+def db_transaction(conn=None):
+    """Transaksi SQLite dengan write lock (BEGIN IMMEDIATE)"""
+    conn = conn or get_db()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+def use_spreadsheet():
+    """True jika metadata disimpan di Google Sheets (bukan mode demo)"""
+    return SPREADSHEET_ID != 'your-spreadsheet-id-here' and get_sheets_service() is not None
+
+def counter_source():
+    """Namespace counter: spreadsheet aktif atau penyimpanan lokal"""
+    return SPREADSHEET_ID if use_spreadsheet() else 'local'
+
+def parse_archive_number(nomor_arsip):
+    """Ambil bagian tingkat 1 dari nomor arsip ('012.03' -> 12)"""
     try:
-        result = sheets_service.spreadsheets().values().get(
+        return int(nomor_arsip.split('.')[0])
+    except (ValueError, IndexError, AttributeError):
+        return None
+
+def local_archive_number_pairs():
+    """(tingkat1, nomor_arsip) yang diketahui tanpa membaca Sheets
+
+    Sumbernya tabel lokal, outbox (arsip yang belum sampai ke Sheets), dan
+    salinan Sheets terakhir di cache jika proses ini sempat membacanya.
+    """
+    conn = get_db()
+    pairs = [(row['tingkat1'], row['nomor_arsip'])
+             for row in conn.execute('SELECT tingkat1, nomor_arsip FROM archives')]
+    cached = archive_cache.snapshot()[0] or []
+    pairs.extend((archive['tingkat1'], archive['nomor_arsip']) for archive in cached)
+    for row in conn.execute('SELECT archive FROM outbox'):
+        archive = json.loads(row['archive'])
+        pairs.append((archive.get('tingkat1'), archive.get('nomor_arsip')))
+    return pairs
+
+@metrics.timed('counter_seed_scan')
+def scan_max_archive_numbers(local_only=False):
+    """Scan sumber metadata sekali untuk mencari nomor terbesar per tingkat1"""
+    max_numbers = {}
+    
+    if use_spreadsheet() and not local_only:
+        # Cukup ambil kolom nomor_arsip dan tingkat1
+        result = google_execute('sheets', get_sheets_service().spreadsheets().values().get(
             spreadsheetId=SPREADSHEET_ID,
-            range='A2:H'
-        ).execute()
-        
-        values = result.get('values', [])
-        
-        max_num = 0
-        for row in values:
-            if len(row) >= 3 and row[2] == tingkat1:
-                try:
-                    nomor_arsip = row[1]
-                    num_part = nomor_arsip.split('.')[0]
-                    num = int(num_part)
-                    max_num = max(max_num, num)
-                except (ValueError, IndexError):
-                    continue
-        
-        next_num = max_num + 1
-        return f"{next_num:03d}"
+            range='B2:C'
+        ))
+        pairs = [(row[1], row[0]) for row in result.get('values', []) if len(row) >= 2]
+    else:
+        pairs = local_archive_number_pairs()
+    
+    for tingkat1, nomor_arsip in pairs:
+        num = parse_archive_number(nomor_arsip)
+        if num is not None:
+            max_numbers[tingkat1] = max(max_numbers.get(tingkat1, 0), num)
+    
+    return max_numbers
+
+_seeded_sources = set()
+_seed_retry_at = {}  # source -> waktu monotonic scan Sheets berikutnya setelah gagal
+
+def seed_archive_counters():
+    """Inisialisasi counter nomor arsip dari sumber metadata (sekali per sumber)
+
+    Jika Sheets tidak bisa dibaca, counter diisi sementara dari tabel lokal
+    dan outbox agar upload tetap mendapat nomor selama gangguan. Scan Sheets
+    dicoba lagi setiap COUNTER_SEED_RETRY_INTERVAL dan hasilnya digabung
+    dengan MAX, sehingga counter tidak pernah mundur.
+    """
+    source = counter_source()
+    if source in _seeded_sources:
+        return
+    
+    conn = get_db()
+    seed_key = f'counters_seeded:{source}'
+    if conn.execute('SELECT 1 FROM meta WHERE key = ?', (seed_key,)).fetchone():
+        _seeded_sources.add(source)
+        return
+    if time.monotonic() < _seed_retry_at.get(source, 0):
+        return
+    
+    # Scan dilakukan di luar lock; upsert dengan MAX sehingga aman jika
+    # beberapa worker melakukan seeding bersamaan
+    try:
+        max_numbers = scan_max_archive_numbers()
+        provisional = False
     except Exception as e:
-        print(f"❌ Error getting next archive number: {e}")
-        import random
-        return f"{random.randint(1, 999):03d}"
+        print(f"❌ Error scanning archive numbers, counter sementara dari data lokal: {e}")
+        max_numbers = scan_max_archive_numbers(local_only=True)
+        provisional = True
+        _seed_retry_at[source] = time.monotonic() + COUNTER_SEED_RETRY_INTERVAL
+    
+    with db_transaction(conn):
+        for tingkat1, num in max_numbers.items():
+            conn.execute(
+                'INSERT INTO archive_counters (source, tingkat1, last_number) VALUES (?, ?, ?) '
+                'ON CONFLICT(source, tingkat1) DO UPDATE SET '
+                'last_number = MAX(last_number, excluded.last_number)',
+                (source, tingkat1, num)
+            )
+        if not provisional:
+            conn.execute(
+                'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                (seed_key, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+    
+    if provisional:
+        return
+    _seeded_sources.add(source)
+    _seed_retry_at.pop(source, None)
+    print(f"✅ Counter nomor arsip diinisialisasi ({len(max_numbers)} kategori)")
+
+@metrics.timed('allocate_number')
+def allocate_archive_number(tingkat1, count=1):
+    """Alokasikan nomor urut tingkat1 berikutnya secara atomik lintas proses
+
+    Dengan count > 1, satu blok nomor berurutan dialokasikan sekaligus dan
+    nomor pertama blok yang dikembalikan.
+    """
+    seed_archive_counters()
+    source = counter_source()
+    
+    with db_transaction() as conn:
+        row = conn.execute(
+            'SELECT last_number FROM archive_counters WHERE source = ? AND tingkat1 = ?',
+            (source, tingkat1)
+        ).fetchone()
+        next_num = (row['last_number'] if row else 0) + 1
+        conn.execute(
+            'INSERT OR REPLACE INTO archive_counters (source, tingkat1, last_number) VALUES (?, ?, ?)',
+            (source, tingkat1, next_num + count - 1)
+        )
+    
+    return next_num
+
+def get_next_archive_number(tingkat1, tingkat2):
+    """Mendapatkan nomor arsip berikutnya
+
+    Error alokasi sengaja diteruskan: nomor acak bisa bentrok dengan nomor
+    yang sudah ada, jadi upload lebih baik gagal.
+    """
+    next_num = allocate_archive_number(tingkat1)
+    return f"{next_num:03d}"
 
 def save_to_spreadsheet(data):
-    """Simpan metadata ke Google Spreadsheet"""
-    if not sheets_service or SPREADSHEET_ID == 'your-spreadsheet-id-here':
+    """Simpan metadata ke Google Spreadsheet (digabung dengan upload lain per batch)"""
+    if not use_spreadsheet():
         # Mode demo - simpan ke file lokal
         return save_to_local_storage(data)
     
+    return sheets_writer.submit(data).result()
+
+def save_rows_to_spreadsheet(archives):
+    """Append beberapa baris metadata dalam satu request ke Google Spreadsheet"""
+    if not use_spreadsheet():
+        return [save_to_local_storage(data) for data in archives]
+    
     try:
-        values = [
-            [
-                data['id'],
-                data['nomor_arsip'],
-                data['tingkat1'],
-                data['tingkat2'],
-                data['judul'],
-                data['deskripsi'],
-                data['tanggal_upload'],
-                data['link_drive'],
-                data['nama_file']
-            ]
-        ]
+        values = [[data[field] for field in ARCHIVE_FIELDS] for data in archives]
         
         body = {
             'values': values
         }
         
-        result = sheets_service.spreadsheets().values().append(
-            spreadsheetId=SPREADSHEET_ID,
-            range='A1',
-            valueInputOption='RAW',
-            insertDataOption='INSERT_ROWS',
-            body=body
-        ).execute()
+        with metrics.timer('sheets_append'):
+            result = google_execute('sheets', get_sheets_service().spreadsheets().values().append(
+                spreadsheetId=SPREADSHEET_ID,
+                range='A1',
+                valueInputOption='RAW',
+                insertDataOption='INSERT_ROWS',
+                body=body
+            ), idempotent=False)
         
-        print(f"✅ Metadata berhasil disimpan ke spreadsheet")
-        return True
+        sheets_sync.note_append(archives, result.get('updates', {}).get('updatedRange'))
+        for data in archives:
+            on_archive_saved(data)
+        print(f"✅ {len(archives)} baris metadata berhasil disimpan ke spreadsheet")
+        return [True] * len(archives)
     except Exception as e:
+        metrics.inc('arsip_google_errors_total', service='sheets', operation='append')
+        metrics.inc('arsip_fallback_local_total', len(archives), operation='sheets_append')
         print(f"❌ Error saving to spreadsheet: {e}")
-        # Fallback ke local storage
-        return save_to_local_storage(data)
+        # Fallback ke local storage; outbox mengirim ulang ke Sheets setelah pulih
+        results = [save_to_local_storage(data) for data in archives]
+        for data, ok in zip(archives, results):
+            if ok:
+                outbox.add(data, need_sheets=True)
+        return results
 
-def save_to_local_storage(data):
-    """Simpan data ke file JSON lokal (fallback)"""
-    try:
-        storage_file = 'data/archives.json'
-        
-        # Buat folder data jika belum ada
-        os.makedirs('data', exist_ok=True)
-        
-        # Load data existing
-        archives = []
-        if os.path.exists(storage_file):
-            with open(storage_file, 'r', encoding='utf-8') as f:
-                archives = json.load(f)
+class SheetsWriteBatcher:
+    """Kumpulkan baris dari upload yang bersamaan lalu append dalam satu request"""
+
+    def __init__(self, window, max_rows):
+        self.window = window
+        self.max_rows = max_rows
+        self._pending = []  # (data, future)
+        self._cond = threading.Condition()
+        self._started_pid = None
+
+    def submit(self, data):
+        future = Future()
+        with self._cond:
+            if self._started_pid != os.getpid():
+                self._started_pid = os.getpid()
+                self._pending = []
+                threading.Thread(target=self._run, name='sheets-writer', daemon=True).start()
+            self._pending.append((data, future))
+            self._cond.notify()
+        return future
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            # Satu baris berarti tidak ada upload lain yang bersamaan: langsung
+            # ditulis, dan baris yang datang selama append berjalan menjadi
+            # batch berikutnya. Window hanya dipakai jika sudah ada baris kedua
+            # (upload memang bersamaan) agar batch terisi sampai penuh.
+            deadline = time.monotonic() + self.window
+            while 1 < len(self._pending) < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[:self.max_rows]
+            self._pending = self._pending[self.max_rows:]
         
-        # Tambah data baru
-        archives.append(data)
-        
-        # Simpan ke file
-        with open(storage_file, 'w', encoding='utf-8') as f:
-            json.dump(archives, f, indent=2, ensure_ascii=False)
+        # Nomor arsip dalam satu tingkat1 ditulis berurutan
+        batch.sort(key=lambda item: (item[0]['tingkat1'],
+                                     parse_archive_number(item[0]['nomor_arsip']) or 0))
+        return batch
+
+    def _run(self):
+        # Satu thread penulis per proses, sehingga batch ditulis berurutan
+        while True:
+            batch = self._take_batch()
+            try:
+                results = save_rows_to_spreadsheet([data for data, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), ok in zip(batch, results):
+                future.set_result(ok)
+
+sheets_writer = SheetsWriteBatcher(SHEETS_BATCH_WINDOW, SHEETS_BATCH_MAX_ROWS)
+
+@metrics.timed('local_metadata_write')
+def save_to_local_storage(data):
+    """Simpan data ke database SQLite lokal (fallback)"""
+    try:
+        with db_transaction() as conn:
+            conn.execute(INSERT_ARCHIVE_SQL, [data.get(field, '') for field in ARCHIVE_FIELDS])
         
+        on_archive_saved(data)
         print(f"✅ Data disimpan secara lokal: {data['nomor_arsip']}")
         return True
     except Exception as e:
+        metrics.inc('arsip_local_errors_total', operation='metadata_write')
         print(f"❌ Error saving to local storage: {e}")
         return False
 
-def get_all_archives():
-    """Ambil semua data arsip"""
-    # Coba ambil dari Google Sheets dulu
-    if sheets_service and SPREADSHEET_ID != 'your-spreadsheet-id-here':
-        try:
-            result = sheets_service.spreadsheets().values().get(
-                spreadsheetId=SPREADSHEET_ID,
-                range='A2:I'
-            ).execute()
+def bump_local_archives_rev(conn):
+    """Tandai bahwa baris lama di tabel archives diubah/dihapus (bukan sekadar ditambah)"""
+    conn.execute("INSERT INTO meta (key, value) VALUES ('archives_rev', '1') "
+                 "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+
+class LocalArchiveSync:
+    """Salinan tabel archives di memori yang hanya dibaca ulang jika datanya berubah
+
+    Versi data = (COUNT(*), MAX(seq), meta archives_rev). Jika hanya ada baris
+    dengan seq baru, cukup baris itu yang dibaca; perubahan/penghapusan baris
+    lama menaikkan archives_rev sehingga salinan dimuat ulang penuh.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._archives = []
+        self._checksum = 0  # archive_checksum(self._archives)
+        self._last_seq = 0
+        self._rev = None
+        self.full_loads = 0
+        self.incremental_loads = 0
+
+    @metrics.timed('local_metadata_read')
+    def refresh(self):
+        """Mengembalikan (daftar arsip, arsip baru, replaced, checksum) seperti SheetsSync.refresh"""
+        with self._lock:
+            conn = get_db()
+            count, max_seq = conn.execute(
+                'SELECT COUNT(*), COALESCE(MAX(seq), 0) FROM archives').fetchone()
+            row = conn.execute("SELECT value FROM meta WHERE key = 'archives_rev'").fetchone()
+            rev = row[0] if row else '0'
             
-            values = result.get('values', [])
-            archives = []
+            if rev == self._rev and max_seq == self._last_seq and count == len(self._archives):
+                return self._archives, [], False, self._checksum
             
-            for row in values:
-                if len(row) >= 9:
-                    archive = {
-                        'id': row[0],
-                        'nomor_arsip': row[1],
-                        'tingkat1': row[2],
-                        'tingkat2': row[3],
-                        'judul': row[4],
-                        'deskripsi': row[5],
-                        'tanggal_upload': row[6],
-                        'link_drive': row[7],
-                        'nama_file': row[8]
-                    }
-                    archives.append(archive)
+            if rev == self._rev and max_seq > self._last_seq:
+                rows = conn.execute(
+                    f"SELECT {', '.join(ARCHIVE_FIELDS)} FROM archives "
+                    "WHERE seq > ? AND seq <= ? ORDER BY seq", (self._last_seq, max_seq)
+                ).fetchall()
+                if len(self._archives) + len(rows) == count:
+                    added = [ArchiveRecord(row) for row in rows]
+                    self._archives = self._archives + added
+                    self._checksum = archive_checksum(added, self._checksum)
+                    self._last_seq = max_seq
+                    self.incremental_loads += 1
+                    return self._archives, added, False, self._checksum
             
-            return archives
+            rows = conn.execute(
+                f"SELECT {', '.join(ARCHIVE_FIELDS)} FROM archives WHERE seq <= ? ORDER BY seq",
+                (max_seq,)
+            ).fetchall()
+            self._archives = [ArchiveRecord(row) for row in rows]
+            self._checksum = archive_checksum(self._archives)
+            self._last_seq = max_seq
+            self._rev = rev
+            self.full_loads += 1
+            return self._archives, self._archives, True, self._checksum
+
+    def stats(self):
+        return {
+            'archives': len(self._archives),
+            'last_seq': self._last_seq,
+            'full_loads': self.full_loads,
+            'incremental_loads': self.incremental_loads
+        }
+
+local_archive_sync = LocalArchiveSync()
+
+def migrate_local_json_archives():
+    """Migrasi satu kali dari data/archives.json ke database SQLite lokal"""
+    if not os.path.exists(LEGACY_STORAGE_FILE):
+        return 0
+    
+    with open(LEGACY_STORAGE_FILE, 'r', encoding='utf-8') as f:
+        archives = json.load(f)
+    
+    with db_transaction() as conn:
+        for data in archives:
+            conn.execute(INSERT_ARCHIVE_SQL.replace('INSERT', 'INSERT OR IGNORE', 1),
+                         [data.get(field, '') for field in ARCHIVE_FIELDS])
+    
+    # Rename agar migrasi tidak diulang di startup berikutnya
+    os.replace(LEGACY_STORAGE_FILE, LEGACY_STORAGE_FILE + '.migrated')
+    print(f"✅ {len(archives)} arsip dimigrasikan dari {LEGACY_STORAGE_FILE}")
+    return len(archives)
+
+def on_archive_saved(data):
+    """Perbarui cache dan indeks secara inkremental setelah arsip tersimpan"""
+    record = ArchiveRecord.from_mapping(data)
+    # Indeks diperbarui lebih dulu agar tidak pernah tertinggal dari versi cache
+    # (ETag /api/archives). Walaupun daftar lengkap tidak sedang di-cache, indeks
+    # tetap valid untuk baris lama; add() mengabaikan ID yang nanti ikut terbaca
+    # dari sumber
+    search_index.add(record)
+    archive_stats.add(record)
+    archive_cache.add_archive(record)
+
+def get_search_index():
+    """Indeks pencarian yang sinkron dengan data arsip di cache"""
+    archives = get_all_archives()
+    if search_index.generation != archive_cache.generation:
+        with search_index._lock:
+            # Dicek ulang di dalam lock: warm-up dan request pertama bisa sampai
+            # di sini bersamaan, cukup satu yang membangun indeks
+            current, generation = archive_cache.snapshot()
+            if search_index.generation != generation:
+                search_index.rebuild(archives if current is None else current, generation)
+    return search_index
+
+def get_archive_stats(refresh=False):
+    """Statistik yang sinkron dengan data arsip di cache (refresh: muat ulang dari sumber)"""
+    if refresh:
+        archive_cache.invalidate()
+        sheets_sync.invalidate()
+        archive_stats.generation = None
+    archives = get_all_archives()
+    if archive_stats.generation != archive_cache.generation:
+        with archive_stats._lock:
+            current, generation = archive_cache.snapshot()
+            if archive_stats.generation != generation:
+                archive_stats.rebuild(archives if current is None else current, generation)
+    return archive_stats
+
+def get_all_archives():
+    """Ambil semua data arsip (melalui cache)"""
+    archives = archive_cache.get('all')
+    if archives is None:
+        archives, added, replaced, checksum = load_all_archives()
+        if archives is not DEMO_ARCHIVES:
+            if not replaced:
+                # Hanya baris baru: teruskan ke indeks dan statistik tanpa rebuild,
+                # sebelum versi cache naik
+                for archive in added:
+                    search_index.add(archive)
+                    archive_stats.add(archive)
+            archive_cache.set_all(archives, replaced, checksum)
+    return archives
+
+def row_to_archive(row):
+    """Konversi satu baris spreadsheet (kolom A:I) menjadi ArchiveRecord"""
+    if len(row) < len(ARCHIVE_FIELDS):
+        return None
+    return ArchiveRecord(row)
+
+def archive_checksum(archives, crc=0):
+    """CRC32 berantai atas isi arsip sesuai urutan; bisa dilanjutkan untuk baris baru"""
+    for archive in archives:
+        row = '\x1f'.join('' if archive[field] is None else str(archive[field]) for field in ARCHIVE_FIELDS)
+        crc = zlib.crc32(row.encode('utf-8') + b'\x1e', crc)
+    return crc
+
+UPDATED_RANGE_PATTERN = re.compile(r"(?:.*!)?[A-Z]+(\d+):[A-Z]+(\d+)$")
+
+class SheetsSync:
+    """Salinan baris spreadsheet di memori yang disinkronkan secara inkremental
+
+    Spreadsheet hanya pernah di-append, jadi refresh cukup mengambil baris
+    setelah baris terakhir yang sudah disinkronkan. Baris terakhir itu ikut
+    diambil sebagai jangkar: jika ID-nya berubah, salinan dimuat ulang penuh.
+    Secara berkala kolom ID dibandingkan (murah) dan salinan dimuat ulang
+    penuh untuk menangkap edit manual di tengah sheet.
+    """
+
+    def __init__(self, check_interval, full_resync_interval):
+        self.check_interval = check_interval
+        self.full_resync_interval = full_resync_interval
+        self._lock = threading.Lock()
+        self._reset(None)
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.rows_fetched = 0
+
+    def _reset(self, spreadsheet_id):
+        self.spreadsheet_id = spreadsheet_id
+        self.synced_row = None  # Baris sheet terakhir yang sudah disinkronkan (1 = header)
+        self._archives = []     # Snapshot arsip valid (copy-on-write)
+        self._checksum = 0      # archive_checksum(self._archives), dilanjutkan di _apply
+        self._row_ids = []      # Isi kolom A untuk baris 2..synced_row
+        self._full_at = 0
+        self._checked_at = 0
+
+    def _fetch(self, a1_range):
+        return google_execute('sheets', get_sheets_service().spreadsheets().values().get(
+            spreadsheetId=SPREADSHEET_ID,
+            range=a1_range
+        )).get('values', [])
+
+    def _apply(self, rows):
+        """Tambahkan baris baru (urut sesuai sheet) ke salinan; mengembalikan arsip barunya"""
+        if not rows:
+            return []
+        new_archives = [a for a in map(row_to_archive, rows) if a]
+        if new_archives:
+            self._archives = self._archives + new_archives
+            self._checksum = archive_checksum(new_archives, self._checksum)
+        self._row_ids.extend(row[0] if row else '' for row in rows)
+        self.synced_row += len(rows)
+        return new_archives
+
+    def _full_sync(self):
+        """Muat ulang seluruh sheet; mengembalikan (arsip baru, replaced)
+
+        Jika baris lama tidak berubah (checksum prefiks sama), hasilnya
+        diperlakukan seperti sinkronisasi inkremental.
+        """
+        with metrics.timer('sheets_read_all'):
+            rows = self._fetch('A2:I')
+        previous, previous_checksum = self._archives, self._checksum
+        same_sheet = self.spreadsheet_id == SPREADSHEET_ID
+        self._reset(SPREADSHEET_ID)
+        self.synced_row = 1
+        archives = self._apply(rows)
+        self._full_at = self._checked_at = time.monotonic()
+        self.full_syncs += 1
+        self.rows_fetched += len(rows)
+
+        prefix = archives[:len(previous)]
+        if (same_sheet and previous and len(prefix) == len(previous)
+                and archive_checksum(prefix) == previous_checksum):
+            added = archives[len(previous):]
+            self._archives = previous + added if added else previous
+            return added, False
+        return archives, True
+
+    def _incremental_sync(self):
+        """Ambil baris setelah baris terakhir; mengembalikan (arsip baru, replaced)"""
+        if self.synced_row < 2:
+            with metrics.timer('sheets_read_new'):
+                rows = self._fetch('A2:I')
+            added = self._apply(rows)
+        else:
+            with metrics.timer('sheets_read_new'):
+                rows = self._fetch(f'A{self.synced_row}:I')
+            anchor = rows[0][0] if rows and rows[0] else ''
+            if anchor != self._row_ids[-1]:
+                print("⚠️  Baris spreadsheet berubah, sinkronisasi ulang penuh")
+                return self._full_sync()
+            added = self._apply(rows[1:])
+        self.incremental_syncs += 1
+        self.rows_fetched += len(rows)
+        return added, False
+
+    def _ids_consistent(self):
+        """Cek murah: kolom ID di sheet harus diawali ID yang sudah disinkronkan"""
+        with metrics.timer('sheets_read_ids'):
+            ids = [row[0] if row else '' for row in self._fetch('A2:A')]
+        self._checked_at = time.monotonic()
+        return ids[:len(self._row_ids)] == self._row_ids
+
+    def refresh(self):
+        """Sinkronkan salinan dengan spreadsheet
+
+        Mengembalikan (daftar arsip, arsip baru sejak refresh sebelumnya,
+        replaced, checksum); replaced=True jika baris lama berubah sehingga
+        indeks harus dibangun ulang.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (self.synced_row is None or self.spreadsheet_id != SPREADSHEET_ID
+                    or now - self._full_at > self.full_resync_interval):
+                added, replaced = self._full_sync()
+            elif now - self._checked_at > self.check_interval and not self._ids_consistent():
+                print("⚠️  Kolom ID spreadsheet tidak konsisten, sinkronisasi ulang penuh")
+                added, replaced = self._full_sync()
+            else:
+                added, replaced = self._incremental_sync()
+            return self._archives, added, replaced, self._checksum
+
+    def invalidate(self):
+        """Paksa sinkronisasi penuh berikutnya (mis. setelah sel diubah)"""
+        with self._lock:
+            self._full_at = float('-inf')
+
+    def note_append(self, archives, updated_range):
+        """Catat baris hasil append sendiri (dari updates.updatedRange) tanpa membaca ulang
+
+        Jika ada baris dari proses lain di antaranya, baris tersebut (dan baris
+        ini) diambil pada refresh berikutnya.
+        """
+        match = UPDATED_RANGE_PATTERN.match(updated_range or '')
+        if not match:
+            return
+        first_row, last_row = int(match.group(1)), int(match.group(2))
+        with self._lock:
+            if (self.synced_row is None or first_row != self.synced_row + 1
+                    or last_row - first_row + 1 != len(archives)):
+                return
+            self._apply([[data[field] for field in ARCHIVE_FIELDS] for data in archives])
+
+    def stats(self):
+        # Tanpa lock: /health tidak boleh menunggu refresh yang sedang berjalan
+        return {
+            'synced_row': self.synced_row,
+            'archives': len(self._archives),
+            'full_syncs': self.full_syncs,
+            'incremental_syncs': self.incremental_syncs,
+            'rows_fetched': self.rows_fetched
+        }
+
+sheets_sync = SheetsSync(SHEETS_SYNC_CHECK_INTERVAL, SHEETS_FULL_RESYNC_INTERVAL)
+
+def load_all_archives():
+    """Ambil semua data arsip dari sumber metadata (Sheets: hanya baris baru)
+
+    Mengembalikan (daftar arsip, arsip baru, replaced, checksum);
+    replaced=True jika daftar harus dianggap baru seluruhnya.
+    """
+    # Coba ambil dari Google Sheets dulu
+    if use_spreadsheet():
+        try:
+            return loaded_from('sheets', *sheets_sync.refresh())
         except Exception as e:
+            metrics.inc('arsip_google_errors_total', service='sheets', operation='read_all')
+            metrics.inc('arsip_fallback_local_total', operation='sheets_read_all')
             print(f"❌ Error getting archives from spreadsheet: {e}")
     
     # Fallback ke local storage
     try:
-        storage_file = 'data/archives.json'
-        if os.path.exists(storage_file):
-            with open(storage_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        archives, added, replaced, checksum = local_archive_sync.refresh()
+        if archives:
+            return loaded_from('local', archives, added, replaced, checksum)
     except Exception as e:
         print(f"❌ Error loading local archives: {e}")
     
     # Data demo sebagai fallback terakhir
+    return loaded_from('demo', DEMO_ARCHIVES, [], True, 0)
+
+_archive_source = {'name': None}
+
+def loaded_from(source, archives, added, replaced, checksum):
+    """Data dari sumber yang berbeda dengan refresh sebelumnya dianggap baru seluruhnya"""
+    if _archive_source['name'] != source:
+        _archive_source['name'] = source
+        replaced = True
+    return archives, added, replaced, checksum
+
+def count_archives():
+    """Jumlah total arsip tanpa mengambil seluruh metadata"""
+    count = archive_cache.get('count')
+    if count is not None:
+        return count
+    
+    archives = archive_cache.get('all')
+    if archives is not None:
+        count = len(archives)
+    elif use_spreadsheet():
+        # Cukup kolom ID saja
+        with metrics.timer('sheets_count'):
+            result = google_execute('sheets', get_sheets_service().spreadsheets().values().get(
+                spreadsheetId=SPREADSHEET_ID,
+                range='A2:A'
+            ))
+        count = len(result.get('values', []))
+    else:
+        count = get_db().execute('SELECT COUNT(*) FROM archives').fetchone()[0]
+    
+    archive_cache.set('count', count)
+    return count
+
+def sort_archives(archives, sort):
+    """Urutkan daftar arsip di memori sesuai opsi sort"""
+    if sort == 'terbaru':
+        return archives[::-1]
+    if sort == 'nomor':
+        return sorted(archives, key=lambda a: a['nomor_arsip'])
+    if sort == 'judul':
+        return sorted(archives, key=lambda a: a['judul'].lower())
+    return archives
+
+@metrics.timed('sheets_read_range')
+def fetch_archive_rows(start_row, end_row):
+    """Ambil jendela baris spreadsheet A{start}:I{end}"""
+    result = google_execute('sheets', get_sheets_service().spreadsheets().values().get(
+        spreadsheetId=SPREADSHEET_ID,
+        range=f'A{start_row}:I{end_row}'
+    ))
+    return [a for a in map(row_to_archive, result.get('values', [])) if a]
+
+def iter_sheet_batches(tingkat1='', tingkat2=''):
+    """Iterasi arsip dari spreadsheet per batch EXPORT_BATCH_ROWS baris, sesuai urutan upload"""
+    start_row = 2
+    while True:
+        with metrics.timer('sheets_read_range'):
+            rows = google_execute('sheets', get_sheets_service().spreadsheets().values().get(
+                spreadsheetId=SPREADSHEET_ID,
+                range=f'A{start_row}:I{start_row + EXPORT_BATCH_ROWS - 1}'
+            )).get('values', [])
+        yield [archive for archive in map(row_to_archive, rows)
+               if (archive and (not tingkat1 or archive['tingkat1'] == tingkat1)
+                   and (not tingkat2 or archive['tingkat2'] == tingkat2))]
+        if len(rows) < EXPORT_BATCH_ROWS:
+            return
+        start_row += EXPORT_BATCH_ROWS
+
+def iter_local_batches(tingkat1='', tingkat2=''):
+    """Iterasi arsip dari tabel lokal per batch EXPORT_BATCH_ROWS baris, sesuai urutan upload"""
+    conditions, params = [], []
+    for field, value in (('tingkat1', tingkat1), ('tingkat2', tingkat2)):
+        if value:
+            conditions.append(f'{field} = ?')
+            params.append(value)
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ''
+    cursor = get_db().execute(
+        f"SELECT {', '.join(ARCHIVE_FIELDS)} FROM archives {where}ORDER BY seq", params
+    )
+    while True:
+        rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+        if not rows:
+            return
+        yield [dict(row) for row in rows]
+
+def open_source_archives(tingkat1='', tingkat2=''):
+    """Iterator arsip langsung dari sumber metadata, batch pertama sudah dibaca
+
+    Tidak memakai cache: memori konstan berapa pun jumlah arsip. Batch pertama
+    dibaca di sini (sebelum respons dimulai) agar error sumber bisa dijawab
+    dengan status yang benar; Sheets gagal → fallback ke tabel lokal seperti
+    load_all_archives. Error tabel lokal diteruskan ke pemanggil.
+    """
+    if use_spreadsheet():
+        batches = iter_sheet_batches(tingkat1, tingkat2)
+        try:
+            first = next(batches, [])
+        except Exception as e:
+            metrics.inc('arsip_google_errors_total', service='sheets', operation='export')
+            metrics.inc('arsip_fallback_local_total', operation='sheets_export')
+            print(f"❌ Error exporting archives from spreadsheet: {e}")
+        else:
+            return chain(first, chain.from_iterable(batches))
+    
+    batches = iter_local_batches(tingkat1, tingkat2)
+    first = next(batches, [])
+    return chain(first, chain.from_iterable(batches))
+
+def get_archive_page(page, per_page, sort='terlama'):
+    """Ambil satu halaman arsip beserta total jumlah arsip"""
+    offset = (page - 1) * per_page
+    key = f'page:{sort}:{page}:{per_page}'
+    
+    cached = archive_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    archives = archive_cache.get('all')
+    if archives is not None:
+        # Data lengkap sudah di-cache: cukup sort dan slice di memori
+        sorted_archives = archive_cache.get(f'sorted:{sort}')
+        if sorted_archives is None:
+            sorted_archives = sort_archives(archives, sort)
+            archive_cache.set(f'sorted:{sort}', sorted_archives)
+        result = (sorted_archives[offset:offset + per_page], len(archives))
+    elif use_spreadsheet() and sort in ('terlama', 'terbaru'):
+        # Urutan upload = urutan baris, jadi cukup baca rentang yang dibutuhkan
+        total = count_archives()
+        if offset >= total:
+            return [], total
+        if sort == 'terlama':
+            start_row = 2 + offset
+            end_row = min(start_row + per_page, total + 2) - 1
+            rows = fetch_archive_rows(start_row, end_row)
+        else:
+            end_row = total + 1 - offset
+            start_row = max(2, end_row - per_page + 1)
+            rows = fetch_archive_rows(start_row, end_row)[::-1]
+        result = (rows, total)
+    elif use_spreadsheet():
+        archives = get_all_archives()
+        result = (sort_archives(archives, sort)[offset:offset + per_page], len(archives))
+    else:
+        column, descending = ARSIP_SORT_OPTIONS[sort]
+        rows = get_db().execute(
+            f"SELECT {', '.join(ARCHIVE_FIELDS)} FROM archives "
+            f"ORDER BY {column} {'DESC' if descending else 'ASC'} LIMIT ? OFFSET ?",
+            (per_page, offset)
+        ).fetchall()
+        result = ([dict(row) for row in rows], count_archives())
+    
+    archive_cache.set(key, result)
+    return result
+
+def now_str():
+    return datetime.now().strftime(UPLOAD_DATE_FORMAT)
+
+class UploadJobQueue:
+    """Antrian job upload persisten (SQLite) dengan pool worker thread terbatas"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._wakeup = threading.Semaphore(0)
+        self._started_pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Jalankan worker thread (sekali per proses, aman setelah fork)"""
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+            self._wakeup = threading.Semaphore(0)
+            for i in range(self.workers):
+                threading.Thread(target=self._run, name=f'upload-worker-{i}', daemon=True).start()
+        print(f"✅ {self.workers} upload worker berjalan (pid {os.getpid()})")
+
+    def enqueue(self, job_id, payload, result=None):
+        with db_transaction() as conn:
+            conn.execute(
+                'INSERT INTO upload_jobs (id, status, message, payload, result, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, 'queued', 'Menunggu antrian', json.dumps(payload),
+                 json.dumps(result) if result else None, now_str(), now_str())
+            )
+        self.start()
+        self._wakeup.release()
+
+    def claim(self):
+        """Ambil satu job yang siap diproses secara atomik lintas proses"""
+        now = time.time()
+        with db_transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM upload_jobs WHERE status = 'queued' "
+                "OR (status = 'running' AND lease_until < ?) ORDER BY created_at LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE upload_jobs SET status = 'running', attempts = attempts + 1, "
+                "lease_until = ?, updated_at = ? WHERE id = ?",
+                (now + JOB_LEASE_SECONDS, now_str(), row['id'])
+            )
+        job = dict(row)
+        job['attempts'] += 1
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else {}
+        return job
+
+    def update(self, job_id, **fields):
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'])
+        if fields.get('status') == 'running':
+            fields['lease_until'] = time.time() + JOB_LEASE_SECONDS
+        fields['updated_at'] = now_str()
+        assignments = ', '.join(f'{key} = ?' for key in fields)
+        get_db().execute(
+            f'UPDATE upload_jobs SET {assignments} WHERE id = ?',
+            list(fields.values()) + [job_id]
+        )
+
+    def get(self, job_id):
+        row = get_db().execute(
+            'SELECT id, status, progress, message, result, attempts, created_at, updated_at '
+            'FROM upload_jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def stats(self):
+        rows = get_db().execute('SELECT status, COUNT(*) FROM upload_jobs GROUP BY status')
+        return {
+            'workers': self.workers,
+            'running_in_process': self._started_pid == os.getpid(),
+            **{status: count for status, count in rows}
+        }
+
+    def _run(self):
+        while True:
+            try:
+                job = self.claim()
+            except Exception as e:
+                print(f"❌ Error claiming upload job: {e}")
+                job = None
+            
+            if job is None:
+                self._wakeup.acquire(timeout=JOB_POLL_INTERVAL)
+                continue
+            
+            try:
+                process_upload_job(job)
+            except Exception as e:
+                print(f"❌ Error processing upload job {job['id']}: {e}")
+                retry = job['attempts'] < JOB_MAX_ATTEMPTS
+                self.update(
+                    job['id'],
+                    status='queued' if retry else 'failed',
+                    message=f'Terjadi kesalahan: {e}' + (' (akan dicoba lagi)' if retry else '')
+                )
+                if not retry:
+                    # Job tidak akan dicoba lagi: file spool tidak dibutuhkan
+                    for spool_path in job_spool_paths(job['payload']):
+                        if os.path.exists(spool_path):
+                            os.remove(spool_path)
+
+upload_jobs = UploadJobQueue(UPLOAD_WORKERS)
+
+def job_spool_paths(payload):
+    """File spool milik satu job (upload tunggal atau massal)"""
+    if payload.get('kind') == 'bulk':
+        return [item['spool_path'] for item in payload['items'] if item.get('spool_path')]
+    return [payload['spool_path']] if payload.get('spool_path') else []
+
+def process_upload_job(job):
+    """Upload file dari spool ke Drive (atau lokal) lalu simpan metadata"""
+    job_id = job['id']
+    payload = job['payload']
+    if payload.get('kind') == 'bulk':
+        return process_bulk_job(job)
+    result = job['result']  # Hasil langkah yang sudah selesai pada percobaan sebelumnya
+    
+    if not result.get('link_drive'):
+        upload_jobs.update(job_id, status='running', progress=5, message='Mengupload file...')
+        
+        def report(fraction):
+            upload_jobs.update(job_id, status='running', progress=5 + int(fraction * 80))
+        
+        file_id, drive_link = None, None
+        with open(payload['spool_path'], 'rb') as f:
+            if get_drive_service() and get_drive_folder_id():
+                file_id, drive_link = upload_to_drive(f, payload['nama_file'], payload['mimetype'], report,
+                                                      archive_id=payload['archive_id'])
+            
+            # Jika gagal upload ke Drive, simpan lokal
+            if not file_id or not drive_link:
+                print("🔄 Menggunakan penyimpanan lokal")
+                if get_drive_service():
+                    metrics.inc('arsip_fallback_local_total', operation='drive_upload')
+                f.seek(0)
+                file_id, drive_link = save_file_locally(f, payload['nama_file'])
+        
+        if not file_id or not drive_link:
+            raise RuntimeError('Gagal mengupload file')
+        
+        result = {'file_id': file_id, 'link_drive': drive_link}
+        upload_jobs.update(job_id, status='running', progress=85, result=result,
+                           message='Menyimpan metadata...')
+    
+    archive_data = {
+        'id': payload['archive_id'],
+        'nomor_arsip': payload['nomor_arsip'],
+        'tingkat1': payload['tingkat1'],
+        'tingkat2': payload['tingkat2'],
+        'judul': payload['judul'],
+        'deskripsi': payload['deskripsi'],
+        'tanggal_upload': payload['tanggal_upload'],
+        'link_drive': result['link_drive'],
+        'nama_file': payload['nama_file']
+    }
+    
+    if not save_to_spreadsheet(archive_data):
+        raise RuntimeError('File berhasil diupload tetapi gagal menyimpan metadata')
+    if is_local_link(archive_data['link_drive']) and get_drive_service():
+        outbox.add(archive_data, need_drive=True)
+    
+    if payload.get('sha256'):
+        record_content_hash(payload['sha256'], archive_data, payload['ukuran'])
+    if not result.get('duplicate_of'):
+        # Arsip duplikat memakai ulang file lama: tidak menambah ukuran penyimpanan
+        archive_stats.record_size(archive_data['id'], payload['ukuran'])
+    
+    if payload['spool_path'] and os.path.exists(payload['spool_path']):
+        os.remove(payload['spool_path'])
+    
+    upload_jobs.update(
+        job_id, status='done', progress=100,
+        message=f"Arsip berhasil diupload! Nomor Arsip: {payload['nomor_arsip']}",
+        result={**result, 'nomor_arsip': payload['nomor_arsip']}
+    )
+
+def process_bulk_job(job):
+    """Upload massal di background; hasil per file disimpan di result job"""
+    job_id = job['id']
+    payload = job['payload']
+    if job['attempts'] > 1:
+        # Percobaan sebelumnya terputus di tengah jalan: sebagian file mungkin
+        # sudah tersimpan dengan nomor arsip, jadi batch tidak diulang
+        for spool_path in job_spool_paths(payload):
+            if os.path.exists(spool_path):
+                os.remove(spool_path)
+        upload_jobs.update(job_id, status='failed',
+                           message='Upload massal terputus, periksa daftar arsip sebelum mengulang')
+        return
+    
+    upload_jobs.update(job_id, status='running', progress=5, message='Mengupload file...')
+    
+    def report(done, total):
+        upload_jobs.update(job_id, status='running', progress=5 + int(done / total * 80),
+                           message=f'Mengupload file {done} dari {total}...')
+    
+    results = process_bulk_upload(payload['tingkat1'], payload['tingkat2'], payload['deskripsi'],
+                                  payload['items'], report)
+    succeeded = sum(1 for r in results if r['success'])
+    upload_jobs.update(
+        job_id, status='done' if succeeded else 'failed', progress=100,
+        message=f'{succeeded} dari {len(results)} file berhasil diupload.',
+        result={'results': results}
+    )
+
+@metrics.timed('spool')
+def spool_upload(stream, limit=MAX_UPLOAD_SIZE):
+    """Simpan stream file upload ke folder spool (dengan batas ukuran limit)
+
+    Hash SHA-256 dihitung sambil stream ditulis. Mengembalikan
+    (spool_path, sha256, ukuran).
+    """
+    os.makedirs(UPLOAD_SPOOL_FOLDER, exist_ok=True)
+    spool_path = os.path.join(UPLOAD_SPOOL_FOLDER, secrets.token_hex(16))
+    digest = hashlib.sha256()
+    size = 0
+    limited = LimitedStream(stream, limit)
+    try:
+        with open(spool_path, 'wb') as f:
+            while True:
+                chunk = limited.read(DRIVE_UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        if os.path.exists(spool_path):
+            os.remove(spool_path)
+        raise
+    metrics.inc('arsip_upload_bytes_total', size)
+    return spool_path, digest.hexdigest(), size
+
+def find_duplicate(sha256):
+    """Arsip yang sudah menyimpan file dengan isi yang sama (atau None)"""
+    if DEDUP_MODE == 'off':
+        return None
+    row = get_db().execute(
+        'SELECT archive_id, nomor_arsip, link_drive FROM content_hashes WHERE sha256 = ?',
+        (sha256,)
+    ).fetchone()
+    return dict(row) if row else None
+
+def record_content_hash(sha256, archive_data, size):
+    """Catat hash file yang baru tersimpan (arsip pertama yang menang)"""
+    try:
+        get_db().execute(
+            'INSERT OR IGNORE INTO content_hashes '
+            '(sha256, archive_id, nomor_arsip, link_drive, ukuran, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (sha256, archive_data['id'], archive_data['nomor_arsip'],
+             archive_data['link_drive'], size, now_str())
+        )
+    except Exception as e:
+        print(f"❌ Error recording content hash: {e}")
+
+def spool_bulk_files(files, limit=MAX_UPLOAD_SIZE):
+    """Spool semua file upload massal (batas limit per file); isi ZIP diekstrak per entry"""
+    items = []  # dict: nama_file, mimetype, spool_path atau error
+    
+    def add(name, mimetype, stream):
+        if len(items) >= BULK_MAX_FILES:
+            raise ValueError(f'Maksimal {BULK_MAX_FILES} file per upload massal')
+        try:
+            spool_path, sha256, size = spool_upload(stream, limit)
+        except UploadTooLargeError:
+            items.append({'nama_file': name, 'error': f'File terlalu besar. Maksimal {limit // (1024 * 1024)}MB.'})
+            return
+        
+        item = {'nama_file': name, 'mimetype': mimetype, 'sha256': sha256, 'ukuran': size}
+        duplicate = find_duplicate(sha256)
+        if duplicate and DEDUP_MODE == 'reject':
+            os.remove(spool_path)
+            item['error'] = f"File sudah diarsipkan dengan Nomor Arsip {duplicate['nomor_arsip']}"
+            item['duplicate_of'] = duplicate['nomor_arsip']
+        elif duplicate:
+            # Pakai ulang file yang sudah ada, tanpa upload ulang
+            os.remove(spool_path)
+            item['link_drive'] = duplicate['link_drive']
+            item['duplicate_of'] = duplicate['nomor_arsip']
+        else:
+            item['spool_path'] = spool_path
+        items.append(item)
+    
+    try:
+        for file in files:
+            if not file or not file.filename:
+                continue
+            if file.filename.lower().endswith('.zip'):
+                with zipfile.ZipFile(file.stream) as archive:
+                    for info in archive.infolist():
+                        if info.is_dir():
+                            continue
+                        with archive.open(info) as entry:
+                            add(os.path.basename(info.filename), None, entry)
+            else:
+                add(file.filename, file.mimetype, file.stream)
+    except BaseException:
+        for item in items:
+            if 'spool_path' in item and os.path.exists(item['spool_path']):
+                os.remove(item['spool_path'])
+        raise
+    
+    return items
+
+def store_bulk_file(item):
+    """Upload satu file hasil spool ke Drive (fallback lokal)"""
+    try:
+        file_id, link = None, None
+        with open(item['spool_path'], 'rb') as f:
+            if get_drive_service() and get_drive_folder_id():
+                file_id, link = upload_to_drive(f, item['nama_file'], item['mimetype'])
+            if not file_id or not link:
+                if get_drive_service():
+                    metrics.inc('arsip_fallback_local_total', operation='drive_upload')
+                f.seek(0)
+                file_id, link = save_file_locally(f, item['nama_file'])
+        return link if file_id else None
+    finally:
+        os.remove(item['spool_path'])
+
+def process_bulk_upload(tingkat1, tingkat2, deskripsi, items, report=None):
+    """Upload paralel, alokasi satu blok nomor arsip, lalu satu append metadata
+
+    report(selesai, total) dipanggil setiap satu file selesai diupload.
+    """
+    # File dengan isi sama dalam satu batch cukup diupload sekali
+    pending, copies, first_by_hash = [], [], {}
+    for item in items:
+        if 'spool_path' not in item:
+            continue
+        original = first_by_hash.get(item['sha256']) if DEDUP_MODE != 'off' else None
+        if original is None:
+            first_by_hash[item['sha256']] = item
+            pending.append(item)
+            continue
+        os.remove(item.pop('spool_path'))
+        if DEDUP_MODE == 'reject':
+            item['error'] = f"File sama dengan {original['nama_file']} dalam upload ini"
+        else:
+            copies.append((item, original))
+    
+    progress = {'done': 0}
+    progress_lock = threading.Lock()
+    
+    def store(item):
+        link = store_bulk_file(item)
+        if report:
+            with progress_lock:
+                progress['done'] += 1
+                report(progress['done'], len(pending))
+        return link
+    
+    with ThreadPoolExecutor(max_workers=BULK_UPLOAD_WORKERS) as pool:
+        links = list(pool.map(store, pending))
+    
+    for item, link in zip(pending, links):
+        if link:
+            item['link_drive'] = link
+        else:
+            item['error'] = 'Gagal mengupload file.'
+    for item, original in copies:
+        if original.get('link_drive'):
+            item['link_drive'] = original['link_drive']
+        else:
+            item['error'] = original['error']
+    
+    stored = [item for item in items if 'error' not in item and item.get('link_drive')]
+    if stored:
+        # Blok nomor berurutan dialokasikan sekali untuk semua file yang tersimpan
+        first_num = allocate_archive_number(tingkat1, len(stored))
+        tingkat2_number = tingkat2.split(' - ')[0]
+        archives = []
+        for offset, item in enumerate(stored):
+            item['nomor_arsip'] = f"{first_num + offset:03d}.{tingkat2_number}"
+            archives.append({
+                'id': secrets.token_hex(8),
+                'nomor_arsip': item['nomor_arsip'],
+                'tingkat1': tingkat1,
+                'tingkat2': tingkat2,
+                'judul': os.path.splitext(item['nama_file'])[0],
+                'deskripsi': deskripsi,
+                'tanggal_upload': now_str(),
+                'link_drive': item['link_drive'],
+                'nama_file': item['nama_file']
+            })
+        
+        for item, data, ok in zip(stored, archives, save_rows_to_spreadsheet(archives)):
+            if not ok:
+                item['error'] = 'File berhasil diupload tetapi gagal menyimpan metadata.'
+                continue
+            if is_local_link(data['link_drive']) and get_drive_service():
+                outbox.add(data, need_drive=True)
+            if 'duplicate_of' not in item and item in pending:
+                # Hanya file yang benar-benar diupload; duplikat memakai ulang file lama
+                record_content_hash(item['sha256'], data, item['ukuran'])
+                archive_stats.record_size(data['id'], item['ukuran'])
+    
     return [
         {
-            'id': 'demo1',
-            'nomor_arsip': '001.01',
-            'tingkat1': 'Surat Masuk',
-            'tingkat2': '01 - Surat dari Perusahaan',
-            'judul': 'Contoh Surat Masuk - DEMO',
-            'deskripsi': 'Ini adalah data demo. File disimpan secara lokal.',
-            'tanggal_upload': '2024-01-15 10:30:00',
-            'link_drive': '#',
-            'nama_file': 'demo_surat_masuk.pdf'
+            'nama_file': item['nama_file'],
+            'success': 'error' not in item,
+            'nomor_arsip': item.get('nomor_arsip'),
+            'link_drive': item.get('link_drive'),
+            'duplicate_of': item.get('duplicate_of'),
+            'message': item.get('error', 'Berhasil')
         }
+        for item in items
     ]
 
+def is_local_link(link):
+    """True jika file arsip tersimpan lokal (fallback), bukan di Drive"""
+    return (link or '').startswith(f'/{LOCAL_UPLOAD_FOLDER}/')
+
+def backoff_seconds(attempts):
+    return min(OUTBOX_INTERVAL * 2 ** max(attempts - 1, 0), OUTBOX_MAX_BACKOFF)
+
+class Outbox:
+    """Antrian persisten arsip yang tersimpan lokal karena Drive/Sheets gagal
+
+    Rekonsiliator di background mengupload file lokal ke Drive, meng-append
+    baris ke Sheets secara batch, lalu memperbarui link_drive. Semua langkah
+    idempoten berdasarkan id arsip: file dicari lewat appProperties di Drive
+    dan baris dicari lewat kolom ID di Sheets sebelum ditulis.
+    """
+
+    LEASE_KEY = 'outbox_lease'
+
+    def __init__(self, interval, batch_size):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._started_pid = None
+        self._lock = threading.Lock()
+
+    def add(self, data, need_drive=False, need_sheets=False):
+        try:
+            get_db().execute(
+                'INSERT INTO outbox (archive_id, archive, need_drive, need_sheets, local_link, '
+                'created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(archive_id) DO UPDATE SET archive = excluded.archive, '
+                'need_drive = MAX(need_drive, excluded.need_drive), '
+                'need_sheets = MAX(need_sheets, excluded.need_sheets), '
+                'local_link = COALESCE(excluded.local_link, local_link), '
+                'next_attempt_at = 0, updated_at = excluded.updated_at',
+                (data['id'], json.dumps(data), int(need_drive), int(need_sheets),
+                 data['link_drive'] if need_drive else None, now_str(), now_str())
+            )
+            print(f"📮 Arsip {data['nomor_arsip']} masuk outbox "
+                  f"({'Drive' if need_drive else ''}{' ' if need_drive and need_sheets else ''}"
+                  f"{'Sheets' if need_sheets else ''})")
+        except Exception as e:
+            metrics.inc('arsip_local_errors_total', operation='outbox_write')
+            print(f"❌ Error adding to outbox: {e}")
+
+    def start(self):
+        """Jalankan rekonsiliator (sekali per proses, aman setelah fork)"""
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+        threading.Thread(target=self._run, name='outbox-reconciler', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.reconcile()
+            except Exception as e:
+                print(f"❌ Error reconciling outbox: {e}")
+
+    def _acquire_lease(self):
+        """Hanya satu proses yang merekonsiliasi dalam satu waktu"""
+        now = time.time()
+        with db_transaction() as conn:
+            row = conn.execute('SELECT value FROM meta WHERE key = ?', (self.LEASE_KEY,)).fetchone()
+            lease = json.loads(row['value']) if row else {}
+            if lease.get('pid') not in (None, os.getpid()) and lease.get('until', 0) > now:
+                return False
+            conn.execute(
+                'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                (self.LEASE_KEY, json.dumps({'pid': os.getpid(), 'until': now + self.interval * 5}))
+            )
+        return True
+
+    def _save(self, entry, **fields):
+        fields['updated_at'] = now_str()
+        entry.update(fields)
+        if 'archive' in fields:
+            fields['archive'] = json.dumps(fields['archive'])
+        assignments = ', '.join(f'{key} = ?' for key in fields)
+        get_db().execute(f'UPDATE outbox SET {assignments} WHERE archive_id = ?',
+                         list(fields.values()) + [entry['archive_id']])
+
+    def _fail(self, entry, error):
+        attempts = entry['attempts'] + 1
+        self._save(entry, attempts=attempts, last_error=str(error)[:500],
+                   next_attempt_at=time.time() + backoff_seconds(attempts))
+
+    def reconcile(self):
+        """Satu putaran: Drive dulu (agar baris yang di-append sudah berisi link Drive), lalu Sheets"""
+        rows = get_db().execute(
+            'SELECT * FROM outbox WHERE next_attempt_at <= ? ORDER BY created_at LIMIT ?',
+            (time.time(), self.batch_size)
+        ).fetchall()
+        if not rows or not self._acquire_lease():
+            return
+        entries = [dict(row, archive=json.loads(row['archive'])) for row in rows]
+        
+        if get_drive_service() and get_drive_folder_id():
+            for entry in entries:
+                if entry['need_drive']:
+                    try:
+                        self._push_file(entry)
+                    except Exception as e:
+                        self._fail(entry, e)
+        
+        pending_sheets = [e for e in entries if e['need_sheets'] or e['need_link']]
+        if pending_sheets and use_spreadsheet():
+            try:
+                self._push_rows(pending_sheets)
+            except Exception as e:
+                print(f"❌ Error replaying outbox ke Sheets: {e}")
+                for entry in pending_sheets:
+                    self._fail(entry, e)
+        
+        done = [e for e in entries if not (e['need_drive'] or e['need_sheets'] or e['need_link'])]
+        for entry in done:
+            self._complete(entry)
+        if done:
+            archive_cache.invalidate()
+            print(f"✅ Outbox: {len(done)} arsip tersinkron ke Google")
+
+    def _push_file(self, entry):
+        """Upload file lokal ke Drive (atau pakai file yang sudah pernah terupload)"""
+        archive = entry['archive']
+        local_link = entry['local_link'] or archive['link_drive']
+        
+        # File yang sama (mis. hasil dedup) cukup diupload sekali
+        row = get_db().execute('SELECT value FROM meta WHERE key = ?', (f'drive_link:{local_link}',)).fetchone()
+        drive_link = row['value'] if row else None
+        
+        if not drive_link:
+            query = (f"appProperties has {{ key='archive_id' and value='{archive['id']}' }} "
+                     f"and trashed=false")
+            existing = google_execute('drive', get_drive_service().files().list(
+                q=query,
+                fields='files(id, webViewLink)'
+            )).get('files', [])
+            if existing:
+                drive_link = existing[0]['webViewLink']
+        
+        if not drive_link:
+            path = os.path.join(LOCAL_UPLOAD_FOLDER, os.path.basename(local_link))
+            mimetype = mimetypes.guess_type(archive['nama_file'])[0]
+            with open(path, 'rb') as f:
+                file_id, drive_link = upload_to_drive(f, archive['nama_file'], mimetype, archive_id=archive['id'])
+            if not file_id or not drive_link:
+                raise RuntimeError('Upload ke Drive gagal')
+        
+        get_db().execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                         (f'drive_link:{local_link}', drive_link))
+        archive['link_drive'] = drive_link
+        # Baris yang sudah ada di Sheets perlu diperbarui link-nya
+        self._save(entry, archive=archive, local_link=local_link, need_drive=0,
+                   need_link=int(use_spreadsheet() and not entry['need_sheets']))
+
+    def _push_rows(self, entries):
+        """Append baris yang belum ada di Sheets dan perbarui link lokal yang sudah diganti"""
+        value_ranges = google_execute('sheets', get_sheets_service().spreadsheets().values().batchGet(
+            spreadsheetId=SPREADSHEET_ID,
+            ranges=['A2:A', 'H2:H']
+        )).get('valueRanges', [])
+        ids = [row[0] if row else '' for row in value_ranges[0].get('values', [])]
+        links = [row[0] if row else '' for row in value_ranges[1].get('values', [])]
+        existing_ids = set(ids)
+        
+        to_append = []
+        for entry in entries:
+            if not entry['need_sheets']:
+                continue
+            if entry['archive']['id'] in existing_ids:
+                # Sudah ter-append sebelumnya (mis. respons append hilang): cukup pastikan link-nya
+                self._save(entry, need_sheets=0, need_link=1 if entry['local_link'] else 0)
+            else:
+                to_append.append(entry)
+        
+        if to_append:
+            archives = [entry['archive'] for entry in to_append]
+            result = google_execute('sheets', get_sheets_service().spreadsheets().values().append(
+                spreadsheetId=SPREADSHEET_ID,
+                range='A1',
+                valueInputOption='RAW',
+                insertDataOption='INSERT_ROWS',
+                body={'values': [[data[field] for field in ARCHIVE_FIELDS] for data in archives]}
+            ), idempotent=False)
+            sheets_sync.note_append(archives, result.get('updates', {}).get('updatedRange'))
+            for entry in to_append:
+                # Link masih lokal: diperbarui setelah file berhasil diupload ke Drive
+                self._save(entry, need_sheets=0, appended=1)
+        
+        # Semua baris yang masih menunjuk ke file lokal lama (termasuk hasil dedup)
+        link_column = chr(ord('A') + ARCHIVE_FIELDS.index('link_drive'))
+        updates = []
+        for entry in entries:
+            if not entry['need_link'] or entry['need_drive']:
+                continue
+            new_link = entry['archive']['link_drive']
+            updates.extend(
+                {'range': f'{link_column}{row_number}', 'values': [[new_link]]}
+                for row_number, link in enumerate(links, start=2) if link == entry['local_link']
+            )
+        if updates:
+            google_execute('sheets', get_sheets_service().spreadsheets().values().batchUpdate(
+                spreadsheetId=SPREADSHEET_ID,
+                body={'valueInputOption': 'RAW', 'data': updates}
+            ))
+            # Salinan lokal Sheets tidak tahu sel yang diubah
+            sheets_sync.invalidate()
+        for entry in entries:
+            if entry['need_link'] and not entry['need_drive']:
+                self._save(entry, need_link=0)
+
+    def _complete(self, entry):
+        archive = entry['archive']
+        with db_transaction() as conn:
+            changed = 0
+            if entry.get('appended'):
+                # Baris sudah ada di Sheets: salinan fallback lokal tidak dipakai lagi
+                changed += conn.execute('DELETE FROM archives WHERE id = ?', (archive['id'],)).rowcount
+            if entry['local_link'] and entry['local_link'] != archive['link_drive']:
+                changed += conn.execute('UPDATE archives SET link_drive = ? WHERE link_drive = ?',
+                                        (archive['link_drive'], entry['local_link'])).rowcount
+                conn.execute('UPDATE content_hashes SET link_drive = ? WHERE link_drive = ?',
+                             (archive['link_drive'], entry['local_link']))
+            if changed:
+                bump_local_archives_rev(conn)
+            conn.execute('DELETE FROM outbox WHERE archive_id = ?', (archive['id'],))
+
+    def stats(self):
+        row = get_db().execute(
+            'SELECT COUNT(*) AS pending, SUM(need_drive) AS drive, SUM(need_sheets) AS sheets, '
+            'MIN(created_at) AS oldest FROM outbox'
+        ).fetchone()
+        last_error = get_db().execute(
+            'SELECT last_error FROM outbox WHERE last_error IS NOT NULL ORDER BY updated_at DESC LIMIT 1'
+        ).fetchone()
+        return {
+            'pending': row['pending'],
+            'need_drive': row['drive'] or 0,
+            'need_sheets': row['sheets'] or 0,
+            'oldest': row['oldest'],
+            'last_error': last_error['last_error'] if last_error else None
+        }
+
+outbox = Outbox(OUTBOX_INTERVAL, OUTBOX_BATCH_SIZE)
+
+def warm_up():
+    """Siapkan Google API, folder Drive, counter, dan indeks tanpa memblokir request"""
+    started = time.monotonic()
+    get_drive_service()
+    get_sheets_service()
+    get_drive_folder_id()
+    
+    # Seed counter nomor arsip sekali per sumber metadata
+    try:
+        seed_archive_counters()
+    except Exception as e:
+        print(f"❌ Error seeding archive counters: {e}")
+    
+    # Bangun indeks pencarian dari sumber metadata
+    try:
+        get_search_index()
+    except Exception as e:
+        print(f"❌ Error building search index: {e}")
+    
+    print(f"✅ Warm-up selesai dalam {time.monotonic() - started:.2f} detik")
+
+_warm_up_pid = None
+
+def start_warm_up():
+    """Jalankan warm-up di background (sekali per proses)"""
+    global _warm_up_pid
+    if _warm_up_pid == os.getpid():
+        return
+    _warm_up_pid = os.getpid()
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+# Migrasi data lokal lama (hanya file lokal, tidak ada panggilan jaringan)
+try:
+    migrate_local_json_archives()
+except Exception as e:
+    print(f"❌ Error migrating local archives: {e}")
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_started' in g:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('arsip_request_duration_seconds', time.perf_counter() - g.request_started,
+                        route=route, method=request.method)
+        metrics.inc('arsip_requests_total', route=route, method=request.method,
+                    status=str(response.status_code))
+    return response
+
+def start_render_timer(sender, template, context, **extra):
+    g.render_started = time.perf_counter()
+
+def record_render_metrics(sender, template, context, **extra):
+    if 'render_started' in g:
+        metrics.observe('arsip_stage_duration_seconds', time.perf_counter() - g.render_started,
+                        stage=f'render:{template.name}')
+
+before_render_template.connect(start_render_timer, app)
+template_rendered.connect(record_render_metrics, app)
+
+@app.before_request
+def reject_oversized_upload():
+    """Tolak upload dari header Content-Length sebelum body dibaca sama sekali"""
+    limit = request_size_limit(request)
+    if limit is not None and request.content_length is not None and request.content_length > limit:
+        raise RequestEntityTooLarge()
+
+@app.teardown_request
+def discard_spool_files(error=None):
+    # Bagian file yang tidak diserahkan ke job (413, form tidak valid, error) dihapus
+    for spool in request.spool_files:
+        try:
+            spool.discard()
+        except OSError as e:
+            print(f"❌ Error removing spool file: {e}")
+
+@app.errorhandler(RequestEntityTooLarge)
+def handle_request_too_large(error):
+    # Batas file yang relevan untuk pesan; form tidak dibaca ulang
+    if request.endpoint == 'upload_bulk':
+        return too_large_response(BULK_MAX_REQUEST_SIZE)
+    return too_large_response(upload_size_limit(request.args.get('tingkat1')))
+
+@app.before_request
+def start_background_workers():
+    # Worker dijalankan per proses (setelah fork gunicorn) untuk melanjutkan
+    # job yang tertunda, termasuk sisa job sebelum restart
+    start_warm_up()
+    upload_jobs.start()
+    outbox.start()
+
+# Job tertunda (termasuk sisa sebelum restart) diproses tanpa menunggu request
+# pertama. Tidak dijalankan di proses pemantau reloader (python app.py dengan
+# debug), yang hanya menjalankan ulang proses anak.
+if START_WORKERS_ON_BOOT and (__name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+    upload_jobs.start()
+    outbox.start()
+
 # Routes (sama seperti sebelumnya)
 @app.route('/')
 def index():
-    return render_template('index.html')
+    try:
+        stats = get_archive_stats().snapshot(days=STATS_DEFAULT_DAYS)
+    except Exception as e:
+        print(f"❌ Error getting archive stats: {e}")
+        stats = None
+    return render_template('index.html', stats=stats, stats_days=STATS_DEFAULT_DAYS)
 
 @app.route('/upload', methods=['GET', 'POST'])
 def upload():
@@ -347,135 +3010,417 @@ def upload():
             file = request.files['file']
             
             if file and file.filename != '':
-                # Validasi file size
-                file.seek(0, os.SEEK_END)
-                file_size = file.tell()
-                file.seek(0)
+                # Parser sudah menulis file langsung ke spool (SpoolFile) sambil
+                # menghitung hash; batas dicek ulang dengan tingkat1 dari form
+                limit = upload_size_limit(tingkat1)
+                if isinstance(file.stream, SpoolFile):
+                    if file.stream.size > limit:
+                        return too_large_response(limit)
+                    spool_path, sha256, size = file.stream.keep()
+                else:
+                    try:
+                        spool_path, sha256, size = spool_upload(file.stream, limit)
+                    except UploadTooLargeError:
+                        return too_large_response(limit)
                 
-                if file_size > 10 * 1024 * 1024:
-                    return jsonify({
-                        'success': False, 
-                        'message': 'File terlalu besar. Maksimal 10MB.'
-                    })
+                # File dengan isi yang sama sudah pernah diarsipkan?
+                duplicate = find_duplicate(sha256)
+                job_result = None
+                if duplicate:
+                    os.remove(spool_path)
+                    spool_path = None
+                    if DEDUP_MODE == 'reject':
+                        return jsonify({
+                            'success': False,
+                            'message': f"File yang sama sudah diarsipkan dengan Nomor Arsip {duplicate['nomor_arsip']}",
+                            'duplicate_of': duplicate['nomor_arsip']
+                        }), 409
+                    # Pakai ulang link file yang sudah ada, tanpa upload ulang
+                    job_result = {'link_drive': duplicate['link_drive'], 'duplicate_of': duplicate['nomor_arsip']}
                 
-                # Generate nomor arsip
-                nomor_arsip_tingkat1 = get_next_archive_number(tingkat1, tingkat2)
+                # Generate nomor arsip setelah file tersimpan agar tidak ada nomor terbuang
+                try:
+                    nomor_arsip_tingkat1 = get_next_archive_number(tingkat1, tingkat2)
+                except Exception as e:
+                    if spool_path:
+                        os.remove(spool_path)
+                    metrics.inc('arsip_allocation_errors_total')
+                    print(f"❌ Error allocating archive number: {e}")
+                    return jsonify({
+                        'success': False,
+                        'message': 'Nomor arsip tidak dapat dialokasikan saat ini, silakan coba lagi nanti'
+                    }), 503
                 tingkat2_number = tingkat2.split(' - ')[0]
                 nomor_arsip = f"{nomor_arsip_tingkat1}.{tingkat2_number}"
                 
-                # Coba upload ke Google Drive dulu
-                file_id, drive_link = None, None
-                if drive_service and DRIVE_FOLDER_ID:
-                    # Simpan file sementara untuk upload
-                    temp_path = f"temp_{secrets.token_hex(8)}_{file.filename}"
-                    file.save(temp_path)
-                    
-                    try:
-                        file_id, drive_link = upload_to_drive(temp_path, file.filename)
-                    finally:
-                        if os.path.exists(temp_path):
-                            os.remove(temp_path)
-                
-                # Jika gagal upload ke Drive, simpan lokal
-                if not file_id or not drive_link:
-                    print("🔄 Menggunakan penyimpanan lokal")
-                    saved_filename, drive_link = save_file_locally(file, file.filename)
-                    file_id = saved_filename
+                # Upload ke Drive dan simpan metadata dikerjakan worker di background
+                job_id = secrets.token_hex(8)
+                upload_jobs.enqueue(job_id, {
+                    'archive_id': secrets.token_hex(8),
+                    'nomor_arsip': nomor_arsip,
+                    'tingkat1': tingkat1,
+                    'tingkat2': tingkat2,
+                    'judul': judul,
+                    'deskripsi': deskripsi,
+                    'tanggal_upload': now_str(),
+                    'nama_file': file.filename,
+                    'mimetype': file.mimetype,
+                    'spool_path': spool_path,
+                    'sha256': None if duplicate else sha256,
+                    'ukuran': size
+                }, job_result)
                 
-                if file_id and drive_link:
-                    archive_data = {
-                        'id': secrets.token_hex(8),
-                        'nomor_arsip': nomor_arsip,
-                        'tingkat1': tingkat1,
-                        'tingkat2': tingkat2,
-                        'judul': judul,
-                        'deskripsi': deskripsi,
-                        'tanggal_upload': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                        'link_drive': drive_link,
-                        'nama_file': file.filename
-                    }
-                    
-                    if save_to_spreadsheet(archive_data):
-                        return jsonify({
-                            'success': True, 
-                            'message': f'Arsip berhasil diupload! Nomor Arsip: {nomor_arsip}',
-                            'nomor_arsip': nomor_arsip
-                        })
-                    else:
-                        return jsonify({
-                            'success': False, 
-                            'message': 'File berhasil diupload tetapi gagal menyimpan metadata.'
-                        })
-                else:
-                    return jsonify({
-                        'success': False, 
-                        'message': 'Gagal mengupload file. Coba lagi.'
-                    })
+                return jsonify({
+                    'success': True, 
+                    'message': f'Arsip diterima dan sedang diproses. Nomor Arsip: {nomor_arsip}',
+                    'nomor_arsip': nomor_arsip,
+                    'job_id': job_id
+                }), 202
             
             return jsonify({'success': False, 'message': 'File tidak valid!'})
             
+        except RequestEntityTooLarge:
+            raise
         except Exception as e:
             print(f"❌ Error in upload: {e}")
             return jsonify({'success': False, 'message': f'Terjadi kesalahan: {str(e)}'})
     
-    return render_template('upload.html', kategori=KATEGORI)
+    upload_limits = {name: upload_size_limit(name) for name in KATEGORI}
+    return render_template('upload.html', kategori=KATEGORI, upload_limits=upload_limits,
+                           max_upload_size=MAX_UPLOAD_SIZE, bulk_upload_enabled=True)
+
+@app.route('/upload/bulk', methods=['POST'])
+def upload_bulk():
+    try:
+        tingkat1 = request.form['tingkat1']
+        tingkat2 = request.form['tingkat2']
+        deskripsi = request.form.get('deskripsi', '')
+        
+        try:
+            items = spool_bulk_files(request.files.getlist('files'), upload_size_limit(tingkat1))
+        except (ValueError, zipfile.BadZipFile) as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        if not items:
+            return jsonify({'success': False, 'message': 'File tidak valid!'})
+        
+        # Upload ke Drive dan simpan metadata dikerjakan worker di background;
+        # hasil per file dibaca client dari /api/jobs/<job_id>
+        job_id = secrets.token_hex(8)
+        upload_jobs.enqueue(job_id, {
+            'kind': 'bulk',
+            'tingkat1': tingkat1,
+            'tingkat2': tingkat2,
+            'deskripsi': deskripsi,
+            'items': items
+        })
+        return jsonify({
+            'success': True,
+            'message': f'{len(items)} file diterima dan sedang diproses.',
+            'job_id': job_id
+        }), 202
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        print(f"❌ Error in bulk upload: {e}")
+        return jsonify({'success': False, 'message': f'Terjadi kesalahan: {str(e)}'})
 
 @app.route('/arsip')
 def arsip():
-    archives = get_all_archives()
-    return render_template('arsip.html', archives=archives)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', ARSIP_PER_PAGE, type=int), 1), ARSIP_MAX_PER_PAGE)
+    sort = request.args.get('sort', 'terlama')
+    if sort not in ARSIP_SORT_OPTIONS:
+        sort = 'terlama'
+    
+    try:
+        archives, total = get_archive_page(page, per_page, sort)
+    except Exception as e:
+        print(f"❌ Error getting archive page: {e}")
+        archives = get_all_archives()
+        total = len(archives)
+        archives = sort_archives(archives, sort)[(page - 1) * per_page:page * per_page]
+    
+    if total == 0 and not use_spreadsheet():
+        # Belum ada arsip lokal: tampilkan data demo
+        archives = DEMO_ARCHIVES if page == 1 else []
+        total = len(archives)
+    
+    total_pages = max((total + per_page - 1) // per_page, 1)
+    return render_template('arsip.html', archives=archives, page=page, per_page=per_page,
+                           sort=sort, total=total, total_pages=total_pages)
 
 @app.route('/search', methods=['GET', 'POST'])
 def search():
     if request.method == 'POST':
-        keyword = request.form.get('keyword', '').lower()
+        keyword = request.form.get('keyword', '')
         tingkat1 = request.form.get('tingkat1', '')
         tingkat2 = request.form.get('tingkat2', '')
+        try:
+            date_from, date_to = parse_date_range(request.form.get('tanggal_dari'),
+                                                  request.form.get('tanggal_sampai'))
+        except ValueError as e:
+            return render_template('search.html', archives=[], facets=facet_counts([]),
+                                   kategori=KATEGORI, search_performed=True, error=str(e))
         
-        all_archives = get_all_archives()
-        filtered_archives = []
-        
-        for archive in all_archives:
-            match = True
-            
-            if keyword:
-                keyword_match = (
-                    keyword in archive['judul'].lower() or 
-                    keyword in archive['nomor_arsip'].lower() or
-                    keyword in archive['deskripsi'].lower()
-                )
-                if not keyword_match:
-                    match = False
-            
-            if tingkat1 and archive['tingkat1'] != tingkat1:
-                match = False
-                
-            if tingkat2 and archive['tingkat2'] != tingkat2:
-                match = False
-                
-            if match:
-                filtered_archives.append(archive)
+        filtered_archives = get_search_index().search(keyword, tingkat1, tingkat2, date_from, date_to)
         
         return render_template('search.html', archives=filtered_archives, 
+                             facets=facet_counts(filtered_archives),
                              kategori=KATEGORI, search_performed=True)
     
     return render_template('search.html', kategori=KATEGORI, search_performed=False)
 
+def encode_cursor(position, archive_id):
+    raw = json.dumps([position, archive_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def resolve_cursor(cursor, results):
+    """Posisi awal halaman berikutnya; ValueError jika cursor tidak valid"""
+    if not cursor:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position, archive_id = json.loads(raw)
+        position = int(position)
+    except (ValueError, TypeError):
+        raise ValueError('Cursor tidak valid')
+    
+    if 0 < position <= len(results) and results[position - 1]['id'] == archive_id:
+        return position
+    # Posisi bergeser (mis. setelah sinkronisasi ulang): cari arsip terakhir yang sudah dikirim
+    for i, archive in enumerate(results):
+        if archive['id'] == archive_id:
+            return i + 1
+    raise ValueError('Cursor kedaluwarsa, ulangi tanpa cursor')
+
+def negotiate_encoding():
+    """Content-Encoding yang diterima client: gzip, deflate atau None"""
+    for encoding in ('gzip', 'deflate'):
+        if request.accept_encodings[encoding]:
+            return encoding
+    return None
+
+def compress_body(body, encoding):
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6)
+    if encoding == 'deflate':
+        return zlib.compress(body, 6)
+    return body
+
+@app.route('/api/archives')
+def api_archives():
+    """Daftar arsip JSON: cursor pagination, proyeksi field, filter seperti /search, ETag"""
+    keyword = request.args.get('keyword', '')
+    tingkat1 = request.args.get('tingkat1', '')
+    tingkat2 = request.args.get('tingkat2', '')
+    try:
+        date_from, date_to = parse_date_range(request.args.get('tanggal_dari'),
+                                              request.args.get('tanggal_sampai'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    cursor = request.args.get('cursor', '')
+    limit = min(max(request.args.get('limit', ARSIP_PER_PAGE, type=int), 1), ARSIP_MAX_PER_PAGE)
+    fields = [f for f in request.args.get('fields', '').split(',') if f] or ARCHIVE_FIELDS
+    unknown = [f for f in fields if f not in ARCHIVE_FIELDS]
+    if unknown:
+        return jsonify({'success': False, 'message': f"Field tidak dikenal: {', '.join(unknown)}"}), 400
+    
+    archives = get_all_archives()
+    encoding = negotiate_encoding()
+    
+    # ETag dari versi isi data + query: poll tanpa perubahan cukup dijawab 304,
+    # juga jika request berikutnya dilayani worker lain. Daftar dan versinya
+    # diambil bersamaan agar add_archive di antaranya tidak menghasilkan body
+    # lama dengan ETag baru
+    if archives is DEMO_ARCHIVES:
+        data_version = 'demo'
+    else:
+        current, data_version = archive_cache.versioned()
+        if current is not None:
+            archives = current
+    query_hash = hashlib.sha1(request.query_string).hexdigest()[:12]
+    etag = f"{data_version}-{query_hash}-{encoding or 'identity'}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        if archives is DEMO_ARCHIVES:
+            results = []
+        elif keyword or tingkat1 or tingkat2 or date_from or date_to:
+            results = get_search_index().search(keyword, tingkat1, tingkat2, date_from, date_to)
+        else:
+            results = archives
+        
+        try:
+            start = resolve_cursor(cursor, results)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        page = results[start:start + limit]
+        end = start + len(page)
+        body = json.dumps({
+            'archives': [{field: archive.get(field) for field in fields} for archive in page],
+            'total': len(results),
+            'next_cursor': encode_cursor(end, page[-1]['id']) if page and end < len(results) else None
+        }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        
+        if len(body) < API_COMPRESS_MIN_SIZE:
+            encoding = None
+        response = Response(compress_body(body, encoding), mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+def export_lines(archives, export_format):
+    """Serialisasi arsip baris per baris (CSV dengan header, atau NDJSON)"""
+    if export_format == 'ndjson':
+        for archive in archives:
+            yield json.dumps(dict(archive), ensure_ascii=False) + '\n'
+        return
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ARCHIVE_FIELDS)
+    yield buffer.getvalue()
+    for archive in archives:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow([archive[field] for field in ARCHIVE_FIELDS])
+        yield buffer.getvalue()
+
+def export_chunks(lines):
+    """Gabungkan baris menjadi chunk ~EXPORT_CHUNK_SIZE; chunk pertama dikirim segera"""
+    pending, size, first = [], 0, True
+    try:
+        for line in lines:
+            data = line.encode('utf-8')
+            if not data:
+                continue
+            pending.append(data)
+            size += len(data)
+            if first or size >= EXPORT_CHUNK_SIZE:
+                yield b''.join(pending)
+                pending, size, first = [], 0, False
+        if pending:
+            yield b''.join(pending)
+    except Exception as e:
+        # Status sudah terkirim: koneksi diputus agar client tahu export tidak lengkap
+        metrics.inc('arsip_export_errors_total')
+        print(f"❌ Error exporting archives: {e}")
+        raise
+
+@app.route('/api/archives/export')
+def export_archives():
+    """Export seluruh arsip (CSV/NDJSON) secara streaming, filter sama dengan /search"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'success': False, 'message': 'Format harus csv atau ndjson'}), 400
+    
+    try:
+        date_from, date_to = parse_date_range(request.args.get('tanggal_dari'),
+                                              request.args.get('tanggal_sampai'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    terms = tokenize(request.args.get('keyword', ''))
+    try:
+        archives = open_source_archives(request.args.get('tingkat1', ''), request.args.get('tingkat2', ''))
+    except Exception as e:
+        # Belum ada byte yang terkirim: jawab 503 daripada 200 yang terpotong
+        metrics.inc('arsip_export_errors_total')
+        print(f"❌ Error exporting archives: {e}")
+        return jsonify({'success': False, 'message': 'Sumber data arsip tidak tersedia, silakan coba lagi nanti'}), 503
+    if terms:
+        archives = (archive for archive in archives if archive_matches(archive, terms))
+    if date_from or date_to:
+        archives = (archive for archive in archives if archive_in_date_range(archive, date_from, date_to))
+    
+    filename = f"arsip-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    response = Response(
+        export_chunks(export_lines(archives, export_format)),
+        mimetype='text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['X-Accel-Buffering'] = 'no'  # Jangan di-buffer oleh reverse proxy
+    return response
+
+@app.route('/api/suggest')
+def api_suggest():
+    """Autocomplete judul/nomor_arsip berdasarkan awalan, untuk dipanggil setiap ketikan"""
+    query = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', SUGGEST_LIMIT, type=int), 1), SUGGEST_MAX_LIMIT)
+    matches = get_search_index().suggest(query, limit) if query.strip() else []
+    return jsonify({
+        'query': query,
+        'suggestions': [
+            {
+                'value': value,
+                'id': archive['id'],
+                'nomor_arsip': archive['nomor_arsip'],
+                'judul': archive['judul'],
+                'tingkat1': archive['tingkat1'],
+                'tingkat2': archive['tingkat2']
+            }
+            for archive, value in matches
+        ]
+    })
+
+@app.route('/api/stats')
+def api_stats():
+    """Statistik arsip: jumlah per kategori, upload per hari, dan total byte"""
+    days = request.args.get('days', STATS_DEFAULT_DAYS, type=int)
+    refresh = request.args.get('refresh') == '1'
+    try:
+        stats = get_archive_stats(refresh).snapshot(days=max(days, 0))
+    except Exception as e:
+        print(f"❌ Error getting archive stats: {e}")
+        return jsonify({'error': 'Statistik tidak tersedia'}), 503
+    response = jsonify(stats)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/jobs/<job_id>')
+def get_job_status(job_id):
+    job = upload_jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job tidak ditemukan'}), 404
+    return jsonify(job)
+
 @app.route('/api/kategori/<tingkat1>')
 def get_subkategori(tingkat1):
     subkategori = KATEGORI.get(tingkat1, [])
     return jsonify(subkategori)
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Metrics semua proses worker dalam format teks Prometheus"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/health')
 def health():
     """Endpoint untuk mengecek status sistem"""
+    # Hanya membaca state bootstrap, tidak memicu panggilan jaringan
+    drive_ready = 'drive' in _resources
+    sheets_ready = 'sheets' in _resources
+    folder_ready = bool(DRIVE_FOLDER_ID or _resources.get('drive_folder'))
     status = {
-        'drive_service': 'available' if drive_service else 'unavailable',
-        'sheets_service': 'available' if sheets_service else 'unavailable',
+        'drive_service': 'available' if drive_ready else 'unavailable',
+        'sheets_service': 'available' if sheets_ready else 'unavailable',
         'spreadsheet_id': 'configured' if SPREADSHEET_ID != 'your-spreadsheet-id-here' else 'not configured',
-        'drive_folder_id': 'available' if DRIVE_FOLDER_ID else 'not available',
-        'credentials_file': 'found' if os.path.exists('credentials.json') else 'not found',
-        'mode': 'production' if (drive_service and sheets_service and DRIVE_FOLDER_ID) else 'demo'
+        'drive_folder_id': 'available' if folder_ready else 'not available',
+        'credentials_file': 'found' if os.path.exists(SERVICE_ACCOUNT_FILE) else 'not found',
+        'mode': 'production' if (drive_ready and sheets_ready and folder_ready) else 'demo',
+        'circuit_breakers': {name: breaker.stats() for name, breaker in breakers.items()},
+        'google_http_pool': http_pool.stats(),
+        'archive_cache': archive_cache.stats(),
+        'sheets_sync': sheets_sync.stats(),
+        'local_archive_sync': local_archive_sync.stats(),
+        'upload_jobs': upload_jobs.stats(),
+        'outbox': outbox.stats()
     }
     return jsonify(status)
 
@@ -489,18 +3434,17 @@ if __name__ == '__main__':
     else:
         print("✅ File credentials.json ditemukan")
     
+    if GOOGLE_API_ENDPOINT:
+        print(f"🧪 Google API diarahkan ke {GOOGLE_API_ENDPOINT} (tanpa autentikasi)")
+    
     if SPREADSHEET_ID == 'your-spreadsheet-id-here':
         print("⚠️  SPREADSHEET_ID belum dikonfigurasi")
     else:
         print("✅ SPREADSHEET_ID sudah dikonfigurasi")
     
-    print(f"\n📁 Folder Drive: {'✅ Tersedia' if DRIVE_FOLDER_ID else '❌ Gagal dibuat'}")
-    
     print("\n📋 Mode operasi:")
-    if drive_service and sheets_service and DRIVE_FOLDER_ID:
-        print("   🟢 PRODUCTION - Terhubung ke Google API")
-    else:
-        print("   🟡 DEMO - Menggunakan penyimpanan lokal")
+    print("   🔄 Google API dan folder Drive disiapkan di background saat request pertama")
+    print("   🟡 Sampai siap (atau jika gagal), aplikasi memakai penyimpanan lokal")
     
     print(f"\n🌐 Aplikasi berjalan di http://localhost:5000")
     print("💡 Kunjungi /health untuk status detail")
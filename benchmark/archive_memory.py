@@ -0,0 +1,92 @@
+"""Bandingkan memori dan waktu build daftar arsip: list of dict vs ArchiveRecord
+
+Baris dibuat dengan generator yang sama seperti run_benchmark.py lalu
+di-roundtrip lewat JSON, sehingga setiap sel adalah objek string sendiri
+seperti respons Sheets API. Memori yang diukur (tracemalloc) adalah yang
+tetap tertahan setelah baris mentah dilepas, yaitu yang dipegang cache.
+
+Contoh:
+    python benchmark/archive_memory.py --rows 10000,100000
+    python benchmark/archive_memory.py --output memori.json
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from run_benchmark import REPO_DIR, generate_rows
+
+def build_dicts(rows, fields):
+    """Representasi lama: satu dict per baris"""
+    return [dict(zip(fields, row)) for row in rows]
+
+def measure(payload, build):
+    """Kembalikan (byte tertahan, detik build, daftar arsip)"""
+    gc.collect()
+    tracemalloc.start()
+    rows = json.loads(payload)
+    started = time.perf_counter()
+    archives = build(rows)
+    elapsed = time.perf_counter() - started
+    del rows
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return retained, elapsed, archives
+
+def benchmark_size(app, row_count, seed):
+    payload = json.dumps(generate_rows(row_count, random.Random(seed)))
+    builders = {
+        'dict': lambda rows: build_dicts(rows, app.ARCHIVE_FIELDS),
+        'record': lambda rows: [app.ArchiveRecord(row) for row in rows]
+    }
+    results = {}
+    for name, build in builders.items():
+        retained, elapsed, archives = measure(payload, build)
+        started = time.perf_counter()
+        app.SearchIndex().rebuild(archives)
+        index_elapsed = time.perf_counter() - started
+        results[name] = {
+            'retained_mb': round(retained / 1024 / 1024, 2),
+            'bytes_per_archive': round(retained / row_count),
+            'build_seconds': round(elapsed, 3),
+            'index_seconds': round(index_elapsed, 3)
+        }
+        del archives
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark memori representasi arsip di app.py')
+    parser.add_argument('--rows', default='10000,100000', help='Jumlah arsip, dipisah koma')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Simpan hasil ke file JSON')
+    args = parser.parse_args()
+
+    # app.py membuat folder data/ relatif terhadap cwd
+    os.chdir(tempfile.mkdtemp(prefix='arsip-memori-'))
+    sys.path.insert(0, REPO_DIR)
+    import app
+
+    all_results = {}
+    for row_count in [int(value) for value in args.rows.split(',')]:
+        results = benchmark_size(app, row_count, args.seed)
+        all_results[str(row_count)] = results
+        print(f"\n{row_count} arsip")
+        print(f"{'representasi':<14}{'MB':>10}{'byte/arsip':>12}{'build (s)':>12}{'indeks (s)':>12}")
+        for name, result in results.items():
+            print(f"{name:<14}{result['retained_mb']:>10}{result['bytes_per_archive']:>12}"
+                  f"{result['build_seconds']:>12}{result['index_seconds']:>12}")
+        saved = 1 - results['record']['retained_mb'] / results['dict']['retained_mb']
+        print(f"penghematan memori: {saved:.0%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(all_results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
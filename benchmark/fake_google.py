@@ -0,0 +1,314 @@
+"""Server tiruan Google Drive & Sheets untuk benchmark (tanpa akses ke Google asli)
+
+Hanya endpoint yang dipakai app.py yang diimplementasikan:
+- Drive: files.list, files.create (metadata & resumable upload), permissions.create
+- Sheets: values.get, values.append, values.batchGet, values.batchUpdate
+
+Jalankan mandiri:
+    python benchmark/fake_google.py --port 8765 --latency-ms 50 --error-rate 0.01
+lalu jalankan app dengan GOOGLE_API_ENDPOINT=http://127.0.0.1:8765
+"""
+import argparse
+import json
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+SHEET_HEADER = ['ID', 'Nomor Arsip', 'Tingkat 1', 'Tingkat 2', 'Judul',
+                'Deskripsi', 'Tanggal Upload', 'Link Drive', 'Nama File']
+
+A1_RANGE = re.compile(r"^(?:(?P<sheet>.+)!)?(?P<c1>[A-Z]+)(?P<r1>\d*)(?::(?P<c2>[A-Z]+)(?P<r2>\d*))?$")
+
+def column_index(letters):
+    """'A' -> 0, 'I' -> 8, 'AA' -> 26"""
+    index = 0
+    for ch in letters:
+        index = index * 26 + ord(ch) - ord('A') + 1
+    return index - 1
+
+def column_letters(index):
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord('A') + rem) + letters
+    return letters
+
+class FakeGoogleState:
+    """Data Drive & Sheets di memori, dipakai bersama oleh semua thread handler"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, error_status=503, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rows = [list(SHEET_HEADER)]  # baris 1 = header, seperti spreadsheet asli
+        self.files = {}  # file_id -> metadata
+        self.uploads = {}  # upload_id -> {'metadata', 'received'}
+        self.stats = {'requests': 0, 'injected_errors': 0, 'uploaded_bytes': 0}
+        self.lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def seed_rows(self, rows):
+        with self.lock:
+            self.rows.extend(list(row) for row in rows)
+
+    def maybe_fail(self):
+        """Tunda respons sesuai latency dan kembalikan status error jika diinjeksi"""
+        with self.lock:
+            self.stats['requests'] += 1
+            delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+            failed = self.error_rate and self._random.random() < self.error_rate
+            if failed:
+                self.stats['injected_errors'] += 1
+        if delay:
+            time.sleep(delay / 1000)
+        return self.error_status if failed else None
+
+    # --- Sheets ---
+
+    def get_values(self, a1_range):
+        match = A1_RANGE.match(a1_range)
+        if not match:
+            return None
+        c1 = column_index(match['c1'])
+        c2 = column_index(match['c2']) if match['c2'] else c1
+        r1 = int(match['r1'] or 1)
+        if match['r2']:
+            r2 = int(match['r2'])
+        elif match['c2'] or not match['r1']:
+            r2 = None  # 'A2:I' = sampai baris terakhir
+        else:
+            r2 = r1
+
+        with self.lock:
+            selected = self.rows[r1 - 1:r2]
+        values = [row[c1:c2 + 1] for row in selected]
+        # Seperti API asli: sel kosong di akhir baris dan baris kosong di akhir dibuang
+        while values and not any(values[-1]):
+            values.pop()
+        return values, f"Sheet1!{match['c1']}{r1}:{match['c2'] or match['c1']}{r2 or len(self.rows)}"
+
+    def update_values(self, a1_range, values):
+        """Timpa sel mulai dari pojok kiri atas range; kembalikan jumlah sel"""
+        match = A1_RANGE.match(a1_range)
+        c1, r1 = column_index(match['c1']), int(match['r1'] or 1)
+        with self.lock:
+            for r, row in enumerate(values, start=r1 - 1):
+                while len(self.rows) <= r:
+                    self.rows.append([])
+                target = self.rows[r]
+                for c, value in enumerate(row, start=c1):
+                    target.extend([''] * (c + 1 - len(target)))
+                    target[c] = value
+        return sum(len(row) for row in values)
+
+    def append_values(self, values):
+        with self.lock:
+            first_row = len(self.rows) + 1
+            self.rows.extend(list(row) for row in values)
+            last_row = len(self.rows)
+        width = max((len(row) for row in values), default=1)
+        return {
+            'updatedRange': f"Sheet1!A{first_row}:{column_letters(width - 1)}{last_row}",
+            'updatedRows': len(values),
+            'updatedColumns': width,
+            'updatedCells': sum(len(row) for row in values)
+        }
+
+    # --- Drive ---
+
+    def create_file(self, metadata, size=0):
+        file_id = secrets.token_hex(12)
+        file = dict(metadata, id=file_id, size=str(size),
+                    webViewLink=f"https://drive.example/file/d/{file_id}/view",
+                    webContentLink=f"https://drive.example/uc?id={file_id}")
+        with self.lock:
+            self.files[file_id] = file
+        return file
+
+    def find_files(self, query):
+        name = re.search(r"name='([^']*)'", query or '')
+        prop = re.search(r"appProperties has \{ key='([^']*)' and value='([^']*)' \}", query or '')
+        with self.lock:
+            return [f for f in self.files.values()
+                    if (not name or f.get('name') == name[1])
+                    and (not prop or f.get('appProperties', {}).get(prop[1]) == prop[2])]
+
+class FakeGoogleHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None  # diisi oleh make_server()
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_json(status, {'error': {'code': status, 'message': message}})
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def handle_request(self, method):
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        body = self.read_body()
+
+        status = self.state.maybe_fail()
+        if status:
+            self.send_error_json(status, 'Injected error')
+            return
+
+        # Sheets: values:batchGet dan values:batchUpdate
+        if re.match(r'^/v4/spreadsheets/[^/]+/values:batchGet$', path) and method == 'GET':
+            value_ranges = []
+            for a1_range in parse_qs(url.query).get('ranges', []):
+                values, resolved = self.state.get_values(a1_range) or ([], a1_range)
+                value_ranges.append({'range': resolved, 'majorDimension': 'ROWS', 'values': values})
+            self.send_json(200, {'valueRanges': value_ranges})
+            return
+        if re.match(r'^/v4/spreadsheets/[^/]+/values:batchUpdate$', path) and method == 'POST':
+            data = json.loads(body or b'{}').get('data', [])
+            updated = sum(self.state.update_values(item['range'], item['values']) for item in data)
+            self.send_json(200, {'totalUpdatedCells': updated})
+            return
+
+        # Sheets: /v4/spreadsheets/{id}/values/{range}[:append]
+        match = re.match(r'^/v4/spreadsheets/[^/]+/values/(.+)$', path)
+        if match:
+            a1_range = match[1]
+            if method == 'POST' and a1_range.endswith(':append'):
+                values = json.loads(body or b'{}').get('values', [])
+                self.send_json(200, {'updates': self.state.append_values(values)})
+                return
+            if method == 'GET':
+                result = self.state.get_values(a1_range)
+                if result is None:
+                    self.send_error_json(400, f'Unable to parse range: {a1_range}')
+                    return
+                values, resolved = result
+                payload = {'range': resolved, 'majorDimension': 'ROWS'}
+                if values:
+                    payload['values'] = values
+                self.send_json(200, payload)
+                return
+
+        # Drive resumable upload: inisiasi lalu PUT per chunk
+        if path == '/upload/drive/v3/files':
+            if method == 'POST' and query.get('uploadType') == 'resumable':
+                upload_id = secrets.token_hex(12)
+                with self.state.lock:
+                    self.state.uploads[upload_id] = {'metadata': json.loads(body or b'{}'), 'received': 0}
+                host = self.headers.get('Host')
+                self.send_json(200, {}, {
+                    'Location': f"http://{host}/upload/drive/v3/files?uploadType=resumable&upload_id={upload_id}"
+                })
+                return
+            if method == 'PUT' and query.get('upload_id') in self.state.uploads:
+                self.handle_upload_chunk(query['upload_id'], body)
+                return
+
+        # Drive metadata: files.list, files.create, permissions.create
+        if path == '/drive/v3/files':
+            if method == 'GET':
+                self.send_json(200, {'files': self.state.find_files(query.get('q'))})
+                return
+            if method == 'POST':
+                self.send_json(200, self.state.create_file(json.loads(body or b'{}')))
+                return
+        if re.match(r'^/drive/v3/files/[^/]+/permissions$', path) and method == 'POST':
+            self.send_json(200, {'kind': 'drive#permission', 'id': 'anyoneWithLink'})
+            return
+
+        self.send_error_json(404, f'Not found: {method} {path}')
+
+    def handle_upload_chunk(self, upload_id, body):
+        # Content-Range: 'bytes 0-262143/1000000' atau 'bytes */1000000'
+        content_range = self.headers.get('Content-Range', '')
+        match = re.match(r'bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)', content_range)
+        total = int(match[3]) if match and match[3] != '*' else None
+
+        with self.state.lock:
+            upload = self.state.uploads[upload_id]
+            upload['received'] += len(body)
+            received = upload['received']
+            self.state.stats['uploaded_bytes'] += len(body)
+
+        if total is None or received < total:
+            headers = {'Range': f'bytes=0-{received - 1}'} if received else {}
+            self.send_response(308)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        with self.state.lock:
+            del self.state.uploads[upload_id]
+        self.send_json(200, self.state.create_file(upload['metadata'], received))
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def do_PUT(self):
+        self.handle_request('PUT')
+
+class FakeGoogleServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Client yang memutus koneksi (timeout/retry) bukan error server
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+def make_server(state, host='127.0.0.1', port=0):
+    """Buat server tiruan; port=0 memilih port kosong (lihat server.server_port)"""
+    handler = type('BoundFakeGoogleHandler', (FakeGoogleHandler,), {'state': state})
+    server = FakeGoogleServer((host, port), handler)
+    return server
+
+def start_server(state, host='127.0.0.1', port=0):
+    """Jalankan server tiruan di thread background, kembalikan (server, endpoint)"""
+    server = make_server(state, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+def main():
+    parser = argparse.ArgumentParser(description='Server tiruan Google Drive & Sheets')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Latency dasar per request')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Tambahan latency acak 0..N ms')
+    parser.add_argument('--error-rate', type=float, default=0, help='Peluang request dibalas error (0-1)')
+    parser.add_argument('--error-status', type=int, default=503)
+    args = parser.parse_args()
+
+    state = FakeGoogleState(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status)
+    server = make_server(state, args.host, args.port)
+    print(f"✅ Server tiruan Google berjalan di http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"📊 {state.stats}")
+
+if __name__ == '__main__':
+    main()
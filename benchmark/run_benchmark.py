@@ -0,0 +1,330 @@
+"""Benchmark /upload, /search dan /arsip terhadap server tiruan Google Drive & Sheets
+
+Untuk setiap ukuran data (default 1k, 10k, 100k baris) harness ini:
+1. menjalankan server tiruan (benchmark/fake_google.py) dan mengisi spreadsheet tiruan,
+2. menjalankan app.py di proses terpisah dengan GOOGLE_API_ENDPOINT mengarah ke server tiruan,
+3. mengirim request paralel per route lalu melaporkan p50/p99 latency dan request/detik.
+
+Contoh:
+    python benchmark/run_benchmark.py --rows 1000,10000 --requests 300 --concurrency 8
+    python benchmark/run_benchmark.py --output hasil.json
+    python benchmark/run_benchmark.py --baseline hasil.json --max-regression 0.25
+"""
+import argparse
+import json
+import os
+import random
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_google import FakeGoogleState, start_server
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROUTES = ('upload', 'search', 'arsip')
+
+KATEGORI = {
+    'Surat Masuk': ['01 - Surat dari Perusahaan', '02 - Surat dari Pemerintah', '03 - Surat dari Individu'],
+    'Surat Keluar': ['01 - Surat ke Perusahaan', '02 - Surat ke Pemerintah', '03 - Surat ke Individu'],
+    'Keuangan': ['01 - Laporan Keuangan', '02 - Budget', '03 - Invoice'],
+    'Kegiatan': ['01 - Rencana Kegiatan', '02 - Laporan Kegiatan', '03 - Foto Dokumentasi'],
+    'Laporan': ['01 - Laporan Bulanan', '02 - Laporan Tahunan', '03 - Laporan Khusus']
+}
+WORDS = ['laporan', 'surat', 'anggaran', 'kegiatan', 'rapat', 'proposal', 'kontrak', 'invoice',
+         'tahunan', 'bulanan', 'pengadaan', 'pegawai', 'kerjasama', 'evaluasi', 'audit', 'dinas',
+         'undangan', 'pemberitahuan', 'keputusan', 'notulen', 'dokumentasi', 'permohonan']
+
+# Server app dijalankan dengan werkzeug multi-thread, sama seperti `python app.py`
+APP_SERVER_CODE = (
+    "import sys; sys.path.insert(0, sys.argv[1]); import app; "
+    "from werkzeug.serving import run_simple; "
+    "run_simple('127.0.0.1', int(sys.argv[2]), app.app, threaded=True)"
+)
+
+def generate_rows(count, rng):
+    """Baris spreadsheet (kolom A:I) dengan nomor arsip berurutan per tingkat1"""
+    rows = []
+    counters = {}
+    kategori = list(KATEGORI.items())
+    for i in range(count):
+        tingkat1, subs = kategori[i % len(kategori)]
+        tingkat2 = rng.choice(subs)
+        counters[tingkat1] = counters.get(tingkat1, 0) + 1
+        judul = ' '.join(rng.choice(WORDS) for _ in range(4)).title()
+        deskripsi = ' '.join(rng.choice(WORDS) for _ in range(12))
+        tanggal = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(1672531200 + i * 600))
+        file_id = f"seed{i:07d}"
+        rows.append([
+            f"arsip{i:07d}",
+            f"{counters[tingkat1]:03d}.{tingkat2.split(' - ')[0]}",
+            tingkat1, tingkat2, judul, deskripsi, tanggal,
+            f"https://drive.example/file/d/{file_id}/view",
+            f"{judul.lower().replace(' ', '_')}.pdf"
+        ])
+    return rows
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def http_request(url, data=None, headers=None, timeout=120):
+    """Kirim request, kembalikan (status, body); error HTTP tidak dianggap exception"""
+    req = urllib.request.Request(url, data=data, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+def encode_multipart(fields, files):
+    boundary = secrets.token_hex(16)
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8'))
+    for name, (filename, content, mimetype) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: {mimetype}\r\n\r\n'.encode('utf-8') + content + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+class AppProcess:
+    """app.py di proses terpisah, dengan direktori kerja (DB, spool, uploads) sementara"""
+
+    def __init__(self, endpoint, env=None):
+        self.workdir = tempfile.TemporaryDirectory(prefix='arsip-bench-')
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.log = open(os.path.join(self.workdir.name, 'app.log'), 'w')
+        self.proc = subprocess.Popen(
+            [sys.executable, '-c', APP_SERVER_CODE, REPO_DIR, str(self.port)],
+            cwd=self.workdir.name,
+            env=dict(os.environ, GOOGLE_API_ENDPOINT=endpoint, PYTHONUNBUFFERED='1', **(env or {})),
+            stdout=self.log, stderr=subprocess.STDOUT
+        )
+
+    def wait_ready(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"app.py berhenti (exit {self.proc.returncode}), lihat {self.log.name}")
+            try:
+                status, _ = http_request(f"{self.base_url}/health", timeout=5)
+                if status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError('app.py tidak siap dalam batas waktu')
+
+    def stop(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        self.log.close()
+        self.workdir.cleanup()
+
+def make_request_factories(base_url, rows, rng, upload_size):
+    """Fungsi pembuat request per route; tiap panggilan mengembalikan (url, data, headers)"""
+    total_pages = max(1, -(-len(rows) // 25))
+    kategori = list(KATEGORI.items())
+
+    def upload():
+        tingkat1, subs = rng.choice(kategori)
+        body, content_type = encode_multipart(
+            {'tingkat1': tingkat1, 'tingkat2': rng.choice(subs),
+             'judul': f"Benchmark {rng.choice(WORDS)}", 'deskripsi': ' '.join(rng.sample(WORDS, 6))},
+            # Isi acak agar tidak terdeteksi sebagai duplikat
+            {'file': ('benchmark.pdf', os.urandom(upload_size), 'application/pdf')}
+        )
+        return f"{base_url}/upload", body, {'Content-Type': content_type}
+
+    def search():
+        fields = {'keyword': rng.choice(WORDS)[:rng.randint(3, 8)]}
+        if rng.random() < 0.5:
+            fields['tingkat1'] = rng.choice(kategori)[0]
+        return (f"{base_url}/search", urllib.parse.urlencode(fields).encode('utf-8'),
+                {'Content-Type': 'application/x-www-form-urlencoded'})
+
+    def arsip():
+        page = rng.randint(1, total_pages)
+        sort = rng.choice(['terlama', 'terbaru', 'nomor', 'judul'])
+        return f"{base_url}/arsip?page={page}&sort={sort}", None, {}
+
+    return {'upload': upload, 'search': search, 'arsip': arsip}
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+def run_load(factory, total, concurrency, timeout):
+    """Kirim `total` request dengan `concurrency` thread; kembalikan ringkasan latency"""
+    requests_ = [factory() for _ in range(total)]  # payload dibuat sebelum pengukuran
+    latencies = []
+    errors = 0
+    responses = []
+
+    def send(req):
+        url, data, headers = req
+        started = time.perf_counter()
+        try:
+            status, body = http_request(url, data, headers, timeout)
+        except OSError:
+            status, body = None, b''
+        return time.perf_counter() - started, status, body
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for elapsed, status, body in pool.map(send, requests_):
+            latencies.append(elapsed)
+            if status is None or status >= 400:
+                errors += 1
+            responses.append((status, body))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': total,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'rps': round(total / wall, 1)
+    }, responses
+
+def wait_for_jobs(base_url, responses, timeout):
+    """Tunggu job upload selesai; kembalikan (selesai, gagal, durasi)"""
+    pending = set()
+    for status, body in responses:
+        if status == 202:
+            pending.add(json.loads(body)['job_id'])
+    started = time.perf_counter()
+    done = failed = 0
+    while pending and time.perf_counter() - started < timeout:
+        for job_id in list(pending):
+            status, body = http_request(f"{base_url}/api/jobs/{job_id}")
+            job = json.loads(body) if status == 200 else {}
+            if job.get('status') in ('done', 'failed'):
+                pending.discard(job_id)
+                done += job['status'] == 'done'
+                failed += job['status'] == 'failed'
+        if pending:
+            time.sleep(0.2)
+    return done, failed + len(pending), time.perf_counter() - started
+
+def benchmark_size(row_count, args):
+    rng = random.Random(args.seed)
+    state = FakeGoogleState(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.seed)
+    print(f"\n🔄 Menyiapkan {row_count} arsip di spreadsheet tiruan...")
+    rows = generate_rows(row_count, rng)
+    state.seed_rows(rows)
+    server, endpoint = start_server(state)
+
+    app_proc = AppProcess(endpoint)
+    results = {}
+    try:
+        app_proc.wait_ready()
+        factories = make_request_factories(app_proc.base_url, rows, rng, args.upload_size)
+
+        # Pemanasan: muat cache arsip, indeks pencarian dan counter nomor arsip
+        started = time.perf_counter()
+        for route in ('arsip', 'search'):
+            url, data, headers = factories[route]()
+            http_request(url, data, headers)
+        print(f"   Pemanasan (muat {row_count} arsip): {time.perf_counter() - started:.2f} detik")
+
+        for route in args.routes:
+            summary, responses = run_load(factories[route], args.requests, args.concurrency, args.timeout)
+            if route == 'upload':
+                done, failed, elapsed = wait_for_jobs(app_proc.base_url, responses, args.job_timeout)
+                summary['jobs_done'] = done
+                summary['jobs_failed'] = failed
+                summary['jobs_per_sec'] = round(done / elapsed, 1) if elapsed else 0.0
+            results[route] = summary
+    finally:
+        app_proc.stop()
+        server.shutdown()
+
+    print(f"   Server tiruan: {state.stats}")
+    return results
+
+def print_report(all_results):
+    print(f"\n{'rows':>8} {'route':<8} {'req':>6} {'err':>5} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>8}  extra")
+    for row_count, results in all_results.items():
+        for route, r in results.items():
+            extra = ''
+            if 'jobs_done' in r:
+                extra = f"jobs {r['jobs_done']} ok/{r['jobs_failed']} gagal, {r['jobs_per_sec']} job/s"
+            print(f"{row_count:>8} {route:<8} {r['requests']:>6} {r['errors']:>5} "
+                  f"{r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['rps']:>8.1f}  {extra}")
+
+def compare_with_baseline(all_results, baseline, max_regression):
+    """Daftar regresi: p99 naik atau req/s turun melebihi batas relatif terhadap baseline"""
+    regressions = []
+    for row_count, results in all_results.items():
+        for route, r in results.items():
+            base = baseline.get(str(row_count), {}).get(route)
+            if not base:
+                continue
+            if base['p99_ms'] and r['p99_ms'] > base['p99_ms'] * (1 + max_regression):
+                regressions.append(f"{row_count} {route}: p99 {base['p99_ms']} -> {r['p99_ms']} ms")
+            if base['rps'] and r['rps'] < base['rps'] * (1 - max_regression):
+                regressions.append(f"{row_count} {route}: req/s {base['rps']} -> {r['rps']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark route app.py dengan server tiruan Google')
+    parser.add_argument('--rows', default='1000,10000,100000', help='Jumlah arsip awal, dipisah koma')
+    parser.add_argument('--routes', default=','.join(ROUTES), help='Route yang diukur, dipisah koma')
+    parser.add_argument('--requests', type=int, default=200, help='Jumlah request per route')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--upload-size', type=int, default=64 * 1024, help='Ukuran file upload (byte)')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Latency dasar server tiruan')
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--timeout', type=float, default=30, help='Batas waktu per request (detik)')
+    parser.add_argument('--job-timeout', type=float, default=300, help='Batas tunggu job upload (detik)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Simpan hasil ke file JSON')
+    parser.add_argument('--baseline', help='File JSON hasil sebelumnya untuk deteksi regresi')
+    parser.add_argument('--max-regression', type=float, default=0.25)
+    args = parser.parse_args()
+    args.routes = [r for r in args.routes.split(',') if r]
+    unknown = set(args.routes) - set(ROUTES)
+    if unknown:
+        parser.error(f"Route tidak dikenal: {', '.join(sorted(unknown))}")
+
+    all_results = {}
+    for row_count in (int(n) for n in args.rows.split(',') if n):
+        all_results[row_count] = benchmark_size(row_count, args)
+
+    print_report(all_results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({str(k): v for k, v in all_results.items()}, f, indent=2)
+        print(f"\n✅ Hasil disimpan ke {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_with_baseline(all_results, json.load(f), args.max_regression)
+        if regressions:
+            print("\n❌ Regresi terdeteksi:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("\n✅ Tidak ada regresi dibanding baseline")
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,18 @@
 import os
 import json
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, g
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import Flow
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaFileUpload, build_http
+import google_auth_httplib2
 import secrets
 
 app = Flask(__name__)
@@ -23,6 +29,16 @@ CLIENT_SECRETS_FILE = "client_secrets.json"
 SPREADSHEET_ID = "your-spreadsheet-id"
 DRIVE_FOLDER_ID = "your-folder-id"  # Bisa menggunakan folder personal atau shared drive
 
+# Cache metadata arsip (in-process, per worker, terpisah per user)
+ARCHIVE_CACHE_TTL = int(os.environ.get('ARCHIVE_CACHE_TTL', 60))  # detik
+ARCHIVE_CACHE_MAX_ENTRIES = int(os.environ.get('ARCHIVE_CACHE_MAX_ENTRIES', 32))
+
+# Cache Google service client per user (LRU)
+SERVICE_CACHE_MAX_USERS = int(os.environ.get('SERVICE_CACHE_MAX_USERS', 64))
+
+# Transport HTTP ke Google yang dipakai ulang antar request (lihat HttpPool)
+GOOGLE_HTTP_POOL_SIZE = int(os.environ.get('GOOGLE_HTTP_POOL_SIZE', 16))  # koneksi idle yang disimpan
+
 # Struktur kategori
 KATEGORI = {
     'Surat Masuk': ['01 - Surat dari Perusahaan', '02 - Surat dari Pemerintah', '03 - Surat dari Individu'],
@@ -32,36 +48,186 @@ KATEGORI = {
     'Laporan': ['01 - Laporan Bulanan', '02 - Laporan Tahunan', '03 - Laporan Khusus']
 }
 
+class ArchiveCache:
+    """Cache metadata arsip dengan TTL dan jumlah entry terbatas (LRU)"""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def add_archive(self, key, data):
+        """Write-through: tambahkan arsip baru ke daftar milik key (user) yang sedang di-cache
+
+        Entry lain (termasuk daftar user lain) dihapus agar dimuat ulang.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            self._entries.clear()
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries[key] = (entry[0], entry[1] + [dict(data)])
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 3) if total else 0.0
+            }
+
+archive_cache = ArchiveCache(ARCHIVE_CACHE_TTL, ARCHIVE_CACHE_MAX_ENTRIES)
+
+class HttpPool:
+    """Pool transport HTTP untuk client Google, dipakai bersama oleh semua user
+
+    httplib2.Http tidak thread-safe, sehingga setiap execute() meminjam satu
+    objek secara eksklusif lalu mengembalikannya. Objek yang dipinjam dibungkus
+    AuthorizedHttp dengan credentials user yang sedang request, jadi koneksi
+    keep-alive bisa dipakai ulang tanpa mencampur token antar user.
+    """
+
+    def __init__(self, max_idle):
+        self.max_idle = max_idle
+        self.created = 0
+        self.in_use = 0
+        self._idle = []
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self, creds):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Socket milik proses induk tidak boleh dipakai setelah fork
+                self._idle = []
+                self._pid = os.getpid()
+                self.in_use = 0
+            http = self._idle.pop() if self._idle else None
+            if http is None:
+                self.created += 1
+            self.in_use += 1
+        if http is None:
+            http = build_http()
+        reusable = False
+        try:
+            yield google_auth_httplib2.AuthorizedHttp(creds, http=http)
+            reusable = True
+        finally:
+            with self._lock:
+                self.in_use -= 1
+                # Koneksi yang error (mis. putus/timeout) tidak dikembalikan ke pool
+                if reusable and len(self._idle) < self.max_idle:
+                    self._idle.append(http)
+
+    def stats(self):
+        return {'idle': len(self._idle), 'in_use': self.in_use, 'created': self.created}
+
+http_pool = HttpPool(GOOGLE_HTTP_POOL_SIZE)
+
+# credential identity -> (creds, drive_service, sheets_service)
+_service_cache = OrderedDict()
+_service_cache_lock = threading.Lock()
+
+def store_credentials(creds):
+    """Simpan credentials ke session (termasuk expiry token)"""
+    session['credentials'] = creds.to_json()
+
+def credential_identity(info):
+    """Kunci cache yang stabil per user (tanpa menyimpan secret sebagai key)"""
+    secret = info.get('refresh_token') or info.get('token') or ''
+    return hashlib.sha256(f"{info.get('client_id')}:{secret}".encode()).hexdigest()
+
+def build_google_services(creds):
+    """Build client Drive dan Sheets dari discovery document bawaan library
+
+    Transport bawaan client tidak dipakai: setiap execute() lewat google_execute()
+    dengan transport pinjaman dari http_pool.
+    """
+    drive_service = build('drive', 'v3', credentials=creds,
+                          static_discovery=True, cache_discovery=False)
+    sheets_service = build('sheets', 'v4', credentials=creds,
+                           static_discovery=True, cache_discovery=False)
+    return drive_service, sheets_service
+
 def get_google_services():
-    """Mendapatkan Google services dengan OAuth credentials"""
-    creds = None
+    """Mendapatkan Google services dengan OAuth credentials (di-cache per user)"""
+    # Satu request cukup satu kali setup credentials/services
+    if 'google_services' in g:
+        return g.google_services
     
     # Load token dari session
-    if 'credentials' in session:
-        creds = Credentials.from_authorized_user_info(json.loads(session['credentials']), SCOPES)
+    if 'credentials' not in session:
+        return None, None
+    
+    info = json.loads(session['credentials'])
+    key = credential_identity(info)
+    
+    with _service_cache_lock:
+        entry = _service_cache.get(key)
+        if entry is not None:
+            _service_cache.move_to_end(key)
     
-    # Jika credentials tidak valid, request login ulang
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
+    if entry is None:
+        creds = Credentials.from_authorized_user_info(info, SCOPES)
+    else:
+        creds = entry[0]
+    
+    # Refresh hanya jika token sudah (hampir) kedaluwarsa
+    if not creds.valid:
+        if creds.expired and creds.refresh_token:
             creds.refresh(Request())
-            session['credentials'] = json.dumps({
-                'token': creds.token,
-                'refresh_token': creds.refresh_token,
-                'token_uri': creds.token_uri,
-                'client_id': creds.client_id,
-                'client_secret': creds.client_secret,
-                'scopes': creds.scopes
-            })
+            store_credentials(creds)
         else:
+            # Jika credentials tidak valid, request login ulang
             return None, None
     
-    try:
-        drive_service = build('drive', 'v3', credentials=creds)
-        sheets_service = build('sheets', 'v4', credentials=creds)
-        return drive_service, sheets_service
-    except Exception as e:
-        print(f"Error building services: {e}")
-        return None, None
+    if entry is None:
+        try:
+            drive_service, sheets_service = build_google_services(creds)
+        except Exception as e:
+            print(f"Error building services: {e}")
+            return None, None
+        
+        entry = (creds, drive_service, sheets_service)
+        with _service_cache_lock:
+            _service_cache[key] = entry
+            while len(_service_cache) > SERVICE_CACHE_MAX_USERS:
+                _service_cache.popitem(last=False)
+    
+    g.google_credentials = entry[0]
+    g.google_services = (entry[1], entry[2])
+    return g.google_services
+
+def google_execute(api_request):
+    """Jalankan request Google API user saat ini dengan transport dari http_pool"""
+    with http_pool.connection(g.google_credentials) as http:
+        return api_request.execute(http=http)
 
 @app.route('/')
 def index():
@@ -100,21 +266,16 @@ def oauth2callback():
     flow.fetch_token(authorization_response=request.url)
 
     # Store credentials in session
-    credentials = flow.credentials
-    session['credentials'] = json.dumps({
-        'token': credentials.token,
-        'refresh_token': credentials.refresh_token,
-        'token_uri': credentials.token_uri,
-        'client_id': credentials.client_id,
-        'client_secret': credentials.client_secret,
-        'scopes': credentials.scopes
-    })
+    store_credentials(flow.credentials)
 
     return redirect(url_for('index'))
 
 @app.route('/logout')
 def logout():
     """Logout dan hapus credentials"""
+    if 'credentials' in session:
+        with _service_cache_lock:
+            _service_cache.pop(credential_identity(json.loads(session['credentials'])), None)
     session.pop('credentials', None)
     session.pop('state', None)
     return redirect(url_for('index'))
@@ -123,6 +284,10 @@ def is_authenticated():
     """Cek apakah user sudah login"""
     return 'credentials' in session
 
+def archives_cache_key():
+    """Kunci cache daftar arsip per user: hasil baca Sheets tidak boleh terlihat user lain"""
+    return f"all:{credential_identity(json.loads(session['credentials']))}"
+
 def get_next_archive_number(tingkat1, tingkat2):
     """Mendapatkan nomor arsip berikutnya berdasarkan tingkat"""
     drive_service, sheets_service = get_google_services()
@@ -132,10 +297,10 @@ def get_next_archive_number(tingkat1, tingkat2):
         return f"{random.randint(1, 999):03d}"
     
     try:
-        result = sheets_service.spreadsheets().values().get(
+        result = google_execute(sheets_service.spreadsheets().values().get(
             spreadsheetId=SPREADSHEET_ID,
             range='A2:H'
-        ).execute()
+        ))
         
         values = result.get('values', [])
         
@@ -173,11 +338,11 @@ def upload_to_drive(file_path, file_name):
             file_metadata['parents'] = [DRIVE_FOLDER_ID]
         
         media = MediaFileUpload(file_path, resumable=True)
-        file = drive_service.files().create(
+        file = google_execute(drive_service.files().create(
             body=file_metadata,
             media_body=media,
             fields='id, webViewLink'
-        ).execute()
+        ))
         
         return file.get('id'), file.get('webViewLink')
     except Exception as e:
@@ -211,21 +376,34 @@ def save_to_spreadsheet(data):
             'values': values
         }
         
-        result = sheets_service.spreadsheets().values().append(
+        result = google_execute(sheets_service.spreadsheets().values().append(
             spreadsheetId=SPREADSHEET_ID,
             range='A1',
             valueInputOption='RAW',
             insertDataOption='INSERT_ROWS',
             body=body
-        ).execute()
+        ))
         
+        archive_cache.add_archive(archives_cache_key(), data)
         return True
     except Exception as e:
         print(f"Error saving to spreadsheet: {e}")
         return False
 
 def get_all_archives():
-    """Ambil semua data arsip dari spreadsheet"""
+    """Ambil semua data arsip dari spreadsheet (melalui cache)"""
+    if not is_authenticated():
+        return load_all_archives()
+    
+    key = archives_cache_key()
+    archives = archive_cache.get(key)
+    if archives is None:
+        archives = load_all_archives()
+        archive_cache.set(key, archives)
+    return archives
+
+def load_all_archives():
+    """Ambil semua data arsip langsung dari spreadsheet"""
     _, sheets_service = get_google_services()
     
     if not sheets_service:
@@ -244,10 +422,10 @@ def get_all_archives():
         ]
     
     try:
-        result = sheets_service.spreadsheets().values().get(
+        result = google_execute(sheets_service.spreadsheets().values().get(
             spreadsheetId=SPREADSHEET_ID,
             range='A2:I'
-        ).execute()
+        ))
         
         values = result.get('values', [])
         archives = []
@@ -382,7 +560,10 @@ def health_check():
     status = {
         'authenticated': is_authenticated(),
         'spreadsheet_id': 'configured' if SPREADSHEET_ID != 'your-spreadsheet-id' else 'not configured',
-        'drive_folder_id': 'configured' if DRIVE_FOLDER_ID != 'your-folder-id' else 'not configured'
+        'drive_folder_id': 'configured' if DRIVE_FOLDER_ID != 'your-folder-id' else 'not configured',
+        'archive_cache': archive_cache.stats(),
+        'service_cache_users': len(_service_cache),
+        'google_http_pool': http_pool.stats()
     }
     return jsonify(status)
 